@@ -0,0 +1,162 @@
+# accounts/authentication.py
+
+import functools
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse
+from django.utils import timezone
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication, get_authorization_header
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+
+
+def token_cache_key(key):
+    # Hashed so raw credentials never appear in cache keys
+    return 'auth:token:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+def token_expiry():
+    """Token lifetime as a timedelta, or None when tokens never expire."""
+    seconds = getattr(settings, 'AUTH_TOKEN_EXPIRY', None)
+    return timedelta(seconds=seconds) if seconds else None
+
+
+def is_expired(token):
+    lifetime = token_expiry()
+    return lifetime is not None and token.created + lifetime <= timezone.now()
+
+
+def invalidate_token(key):
+    cache.delete(token_cache_key(key))
+
+
+def revoke_token(token):
+    """Deletes ``token`` and drops its cache entry so it stops working immediately."""
+    invalidate_token(token.key)
+    token.delete()
+
+
+def rotate_token(user):
+    """Replaces ``user``'s token with a fresh one and returns it."""
+    for token in Token.objects.filter(user=user):
+        revoke_token(token)
+    return Token.objects.create(user=user)
+
+
+def issue_token(user):
+    """Returns ``user``'s current token, rotating it first if it has expired."""
+    token, created = Token.objects.get_or_create(user=user)
+    if not created and is_expired(token):
+        token = rotate_token(user)
+    return token
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication that keeps the token (with its user) in Django's cache for
+    AUTH_TOKEN_CACHE_TIMEOUT seconds, so authenticated requests skip the
+    authtoken_token/user join. Tokens older than AUTH_TOKEN_EXPIRY seconds are
+    rejected and deleted. Logout, rotation and user changes invalidate the entry
+    explicitly; the timeout bounds staleness for anything else.
+    """
+
+    def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        token = cache.get(cache_key)
+
+        if token is None:
+            try:
+                token = Token.objects.select_related('user').get(key=key)
+            except Token.DoesNotExist:
+                raise exceptions.AuthenticationFailed('Invalid token.')
+            if token.user.is_active and not is_expired(token):
+                cache.set(cache_key, token, self.cache_timeout(token))
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+        if is_expired(token):
+            revoke_token(token)
+            raise exceptions.AuthenticationFailed('Token has expired.')
+
+        return (token.user, token)
+
+    # --- Async variants (for plain Django async views, see async_token_required) ---
+
+    async def aauthenticate(self, request):
+        key = self.get_key(request)
+        if key is None:
+            return None
+        return await self.aauthenticate_credentials(key)
+
+    async def aauthenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        token = await cache.aget(cache_key)
+
+        if token is None:
+            try:
+                token = await Token.objects.select_related('user').aget(key=key)
+            except Token.DoesNotExist:
+                raise exceptions.AuthenticationFailed('Invalid token.')
+            if token.user.is_active and not is_expired(token):
+                await cache.aset(cache_key, token, self.cache_timeout(token))
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+        if is_expired(token):
+            await cache.adelete(cache_key)
+            await token.adelete()
+            raise exceptions.AuthenticationFailed('Token has expired.')
+
+        return (token.user, token)
+
+    def get_key(self, request):
+        """The token from an ``Authorization: Token <key>`` header, parsed as authenticate() does."""
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed('Invalid token header.')
+        try:
+            return auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed('Invalid token header. Token string should not contain invalid characters.')
+
+    @staticmethod
+    def cache_timeout(token):
+        timeout = getattr(settings, 'AUTH_TOKEN_CACHE_TIMEOUT', 300)
+        lifetime = token_expiry()
+        if lifetime is not None:
+            # Never keep a token cached past its expiry
+            remaining = (token.created + lifetime - timezone.now()).total_seconds()
+            timeout = max(1, min(timeout, int(remaining)))
+        return timeout
+
+
+def async_token_required(view_func):
+    """
+    Authenticates an async Django view with CachedTokenAuthentication without leaving
+    the event loop. The view receives a DRF Request (so paginators and serializers work
+    unchanged) with ``user`` and ``auth`` set; failures get DRF's 401 response body.
+    """
+    authenticator = CachedTokenAuthentication()
+
+    @functools.wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            credentials = await authenticator.aauthenticate(request)
+            if credentials is None:
+                raise exceptions.NotAuthenticated()
+        except exceptions.APIException as exc:
+            response = JsonResponse({'detail': exc.detail}, status=401)
+            response['WWW-Authenticate'] = authenticator.authenticate_header(request)
+            return response
+
+        drf_request = Request(request)
+        drf_request.user, drf_request.auth = credentials
+        return await view_func(drf_request, *args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,114 @@
+# accounts/management/commands/compute_follow_recommendations.py
+#
+# Offline "who to follow": loads the follow graph into compact CSR integer arrays
+# (offsets + targets, indexed by dense user position), scores each user's two-hop
+# neighbourhood in a process pool and replaces the FollowRecommendation table.
+
+import heapq
+import os
+from array import array
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+
+from accounts.models import CustomUser, FollowRecommendation
+
+# CSR arrays installed in each worker process by _init_worker
+_graph = None
+
+
+def _init_worker(offsets, targets):
+    global _graph
+    _graph = (offsets, targets)
+
+
+def _score_range(task):
+    """Scores users [start, stop): candidate -> number of followed users who follow it."""
+    start, stop, limit = task
+    offsets, targets = _graph
+    results = []
+
+    for user in range(start, stop):
+        followed = targets[offsets[user]:offsets[user + 1]]
+        if not followed:
+            continue
+
+        scores = Counter()
+        for middle in followed:
+            scores.update(targets[offsets[middle]:offsets[middle + 1]])
+        for excluded in (user, *followed):
+            scores.pop(excluded, None)
+
+        # Highest score first; ties go to the lower (older) user position
+        top = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], -item[0]))
+        if top:
+            results.append((user, top))
+    return results
+
+
+def load_graph():
+    """Returns (user_ids, offsets, targets): the follow graph in CSR form over dense positions."""
+    user_ids = array('q', CustomUser.objects.order_by('pk').values_list('pk', flat=True))
+    position = {user_id: index for index, user_id in enumerate(user_ids)}
+
+    Follow = CustomUser.followers.through
+    edges = Follow.objects.order_by('to_customuser_id', 'from_customuser_id').values_list(
+        'to_customuser_id', 'from_customuser_id'
+    )
+
+    offsets = array('q', [0] * (len(user_ids) + 1))
+    targets = array('q')
+    # Edges arrive grouped by follower, so each follower's row is appended contiguously
+    for follower_id, followee_id in edges.iterator(chunk_size=10000):
+        offsets[position[follower_id] + 1] += 1
+        targets.append(position[followee_id])
+    for index in range(len(user_ids)):
+        offsets[index + 1] += offsets[index]
+
+    return user_ids, offsets, targets
+
+
+class Command(BaseCommand):
+    help = "Precomputes friends-of-friends follow recommendations ranked by mutual follows."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--limit', type=int, default=20, help="Recommendations kept per user.")
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Users scored per task.")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Rows per INSERT.")
+
+    def handle(self, *args, **options):
+        user_ids, offsets, targets = load_graph()
+        self.stdout.write(f"Loaded {len(user_ids)} users and {len(targets)} follow edges.")
+
+        chunk = options['chunk_size']
+        tasks = [
+            (start, min(start + chunk, len(user_ids)), options['limit'])
+            for start in range(0, len(user_ids), chunk)
+        ]
+
+        if options['workers'] > 1:
+            # Don't share the parent's database handle with forked workers
+            connections.close_all()
+            with ProcessPoolExecutor(
+                max_workers=options['workers'], initializer=_init_worker, initargs=(offsets, targets)
+            ) as pool:
+                scored = [result for results in pool.map(_score_range, tasks) for result in results]
+        else:
+            _init_worker(offsets, targets)
+            scored = [result for task in tasks for result in _score_range(task)]
+
+        rows = [
+            FollowRecommendation(user_id=user_ids[user], candidate_id=user_ids[candidate], score=score)
+            for user, top in scored
+            for candidate, score in top
+        ]
+        with transaction.atomic():
+            FollowRecommendation.objects.all().delete()
+            FollowRecommendation.objects.bulk_create(rows, batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Stored {len(rows)} recommendations for {len(scored)} users."
+        ))
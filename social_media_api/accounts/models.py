@@ -17,5 +17,41 @@ class CustomUser(AbstractUser):
         blank=True
     )
 
+    # Denormalized follow counters, kept current with F() updates in FollowViewSet.
+    # Drift is fixed by the reconcile_counters command.
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return self.username
+
+
+class FollowRecommendation(models.Model):
+    """
+    Precomputed "who to follow" candidate, scored by the number of mutual follows
+    (people ``user`` follows who follow ``candidate``). Written offline by the
+    compute_follow_recommendations command; the API only reads this table.
+    """
+
+    user = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name='follow_recommendations'
+    )
+    candidate = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    score = models.PositiveIntegerField()
+    computed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-score']
+        unique_together = ('user', 'candidate')
+        indexes = [
+            models.Index(fields=['user', '-score'], name='recommendation_user_score_idx'),
+        ]
+
     def __str__(self):
-        return self.username
\ No newline at end of file
+        return f'{self.candidate} for {self.user} ({self.score} mutual)'
@@ -4,7 +4,7 @@ from rest_framework import serializers
 from django.contrib.auth import authenticate
 from django.contrib.auth import get_user_model
 from rest_framework.authtoken.models import Token
-from .models import CustomUser 
+from .models import CustomUser, FollowRecommendation
 
 
 # --- User Registration Serializer (Ensures password is hashed correctly) ---
@@ -42,22 +42,14 @@ class UserSerializer(serializers.ModelSerializer):
     # CRITICAL FIX: Correct the field name
     profile_picture = serializers.ImageField(required=False, allow_null=True) 
     
-    # CRITICAL FIX: Add missing methods for SerializerMethodField
-    followers_count = serializers.SerializerMethodField()
-    following_count = serializers.SerializerMethodField()
-
     class Meta:
         model = CustomUser
         # Exclude password field from the fields list, as this is for read/update
         fields = ('id', 'username', 'email', 'bio', 'profile_picture', 
                   'date_joined', 'followers_count', 'following_count')
-        read_only_fields = ('username', 'email', 'date_joined') 
-    
-    def get_followers_count(self, obj):
-        return obj.followers.count()
-    
-    def get_following_count(self, obj):
-        return obj.following.count()
+        # Follow counts are denormalized columns maintained by FollowViewSet
+        read_only_fields = ('username', 'email', 'date_joined',
+                            'followers_count', 'following_count')
 
 
 # --- Login Serializer (Acceptable for processing login credentials) ---
@@ -78,4 +70,30 @@ class LoginSerializer(serializers.Serializer):
             attrs['user'] = user
             return attrs
         
-        raise serializers.ValidationError('Invalid credentials')
\ No newline at end of file
+        raise serializers.ValidationError('Invalid credentials')
+
+
+# --- Bulk Follow Serializer (ids and/or usernames of the users to (un)follow) ---
+class BulkFollowSerializer(serializers.Serializer):
+    """Validates a bulk follow/unfollow request."""
+
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, max_length=500)
+    usernames = serializers.ListField(child=serializers.CharField(), required=False, max_length=500)
+
+    def validate(self, attrs):
+        if not attrs.get('ids') and not attrs.get('usernames'):
+            raise serializers.ValidationError('Provide "ids" and/or "usernames".')
+        return attrs
+
+
+
+# --- Follow Recommendation Serializer (read-only, precomputed offline) ---
+class FollowRecommendationSerializer(serializers.ModelSerializer):
+    """A recommended user and the number of mutual follows behind the suggestion."""
+
+    user = UserSerializer(source='candidate', read_only=True)
+    mutual_follows = serializers.IntegerField(source='score', read_only=True)
+
+    class Meta:
+        model = FollowRecommendation
+        fields = ('user', 'mutual_follows', 'computed_at')
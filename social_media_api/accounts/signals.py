@@ -0,0 +1,22 @@
+# accounts/signals.py
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import invalidate_token
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL, dispatch_uid='accounts_refresh_cached_token')
+def refresh_cached_token(sender, instance, created, raw=False, **kwargs):
+    # Cached tokens carry a copy of the user; drop it so password/is_active changes apply now
+    if created or raw:
+        return
+    for key in Token.objects.filter(user_id=instance.pk).values_list('key', flat=True):
+        invalidate_token(key)
+
+
+@receiver(post_delete, sender=Token, dispatch_uid='accounts_uncache_deleted_token')
+def uncache_deleted_token(sender, instance, **kwargs):
+    invalidate_token(instance.key)
@@ -1,3 +1,243 @@
-from django.test import TestCase
+# accounts/tests.py
 
-# Create your tests here.
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from .models import CustomUser, FollowRecommendation
+from .views import follow_users, unfollow_users
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class FollowTestCase(APITestCase):
+    def setUp(self):
+        self.alice = CustomUser.objects.create_user(username='alice', password='testpass123')
+        self.bob = CustomUser.objects.create_user(username='bob', password='testpass123')
+        self.client.force_authenticate(self.alice)
+
+    def test_follow_and_unfollow_update_counters(self):
+        response = self.client.post(reverse('customuser-follow', args=[self.bob.pk]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.alice.refresh_from_db()
+        self.bob.refresh_from_db()
+        self.assertEqual((self.alice.following_count, self.bob.followers_count), (1, 1))
+
+        response = self.client.post(reverse('customuser-unfollow', args=[self.bob.pk]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.alice.refresh_from_db()
+        self.bob.refresh_from_db()
+        self.assertEqual((self.alice.following_count, self.bob.followers_count), (0, 0))
+
+    def test_cannot_follow_self(self):
+        response = self.client.post(reverse('customuser-follow', args=[self.alice.pk]))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_follow_twice_is_rejected_without_double_counting(self):
+        self.client.post(reverse('customuser-follow', args=[self.bob.pk]))
+        response = self.client.post(reverse('customuser-follow', args=[self.bob.pk]))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.bob.refresh_from_db()
+        self.assertEqual(self.bob.followers_count, 1)
+
+    def test_follow_racing_a_concurrent_insert_counts_once(self):
+        self.client.post(reverse('customuser-follow', args=[self.bob.pk]))
+        # The existence check misses the edge, as if a concurrent request inserted it
+        # right after; the insert then conflicts and nothing is counted twice
+        with mock.patch('accounts.views.set', create=True, return_value=set()):
+            self.assertEqual(follow_users(self.alice, [self.bob]), [])
+        self.alice.refresh_from_db()
+        self.bob.refresh_from_db()
+        self.assertEqual((self.alice.following_count, self.bob.followers_count), (1, 1))
+
+    def test_unfollow_decrements_by_deleted_edges(self):
+        carol = CustomUser.objects.create_user(username='carol', password='testpass123')
+        follow_users(self.alice, [self.bob, carol])
+        self.assertEqual(unfollow_users(self.alice, [self.bob, carol]), [self.bob, carol])
+        self.assertEqual(unfollow_users(self.alice, [self.bob, carol]), [])
+        self.alice.refresh_from_db()
+        carol.refresh_from_db()
+        self.assertEqual((self.alice.following_count, carol.followers_count), (0, 0))
+
+    def test_non_numeric_user_id_is_404(self):
+        for name, method in [('customuser-follow', 'post'), ('customuser-unfollow', 'post'),
+                             ('customuser-followers', 'get'), ('customuser-following', 'get')]:
+            with self.subTest(name=name):
+                response = getattr(self.client, method)(reverse(name, args=['abc']))
+                self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class BulkFollowTestCase(APITestCase):
+    def setUp(self):
+        self.alice = CustomUser.objects.create_user(username='alice', password='testpass123')
+        self.others = [
+            CustomUser.objects.create_user(username=f'user{i}', password='testpass123') for i in range(4)
+        ]
+        self.client.force_authenticate(self.alice)
+
+    def test_bulk_follow_by_ids_and_usernames(self):
+        response = self.client.post(
+            reverse('customuser-bulk-follow'),
+            {'ids': [self.others[0].pk, self.alice.pk], 'usernames': ['user1', 'user2', 'nobody']},
+            format='json',
+        )
+        self.assertEqual(sorted(response.data['followed']), ['user0', 'user1', 'user2'])
+        self.alice.refresh_from_db()
+        self.assertEqual(self.alice.following_count, 3)
+
+        response = self.client.post(
+            reverse('customuser-bulk-unfollow'), {'usernames': ['user0', 'user3']}, format='json'
+        )
+        self.assertEqual(response.data['unfollowed'], ['user0'])
+        self.alice.refresh_from_db()
+        self.others[0].refresh_from_db()
+        self.assertEqual((self.alice.following_count, self.others[0].followers_count), (2, 0))
+
+    def test_bulk_follow_requires_targets(self):
+        response = self.client.post(reverse('customuser-bulk-follow'), {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_follower_and_following_lists_are_cursor_paginated(self):
+        for user in self.others:
+            user.following.add(self.alice)
+        self.alice.following.add(self.others[0])
+
+        names, url = [], reverse('customuser-followers', args=[self.alice.pk]) + '?page_size=3'
+        while url:
+            response = self.client.get(url)
+            names += [user['username'] for user in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(names, ['user3', 'user2', 'user1', 'user0'])
+
+        response = self.client.get(reverse('customuser-following', args=[self.alice.pk]))
+        self.assertEqual([u['username'] for u in response.data['results']], ['user0'])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class FollowRecommendationTestCase(APITestCase):
+    def setUp(self):
+        names = ['alice', 'bob', 'carol', 'dave', 'erin']
+        self.users = {name: CustomUser.objects.create_user(username=name, password='testpass123') for name in names}
+        u = self.users
+        # alice follows bob and carol; both follow dave, only carol follows erin
+        u['alice'].following.add(u['bob'], u['carol'])
+        u['bob'].following.add(u['dave'], u['alice'])
+        u['carol'].following.add(u['dave'], u['erin'])
+
+    def recommendations(self):
+        self.client.force_authenticate(self.users['alice'])
+        response = self.client.get(reverse('follow_recommendations'))
+        return [(r['user']['username'], r['mutual_follows']) for r in response.data]
+
+    def test_ranked_by_mutual_follows(self):
+        call_command('compute_follow_recommendations', workers=1, stdout=StringIO())
+        self.assertEqual(self.recommendations(), [('dave', 2), ('erin', 1)])
+        self.assertTrue(FollowRecommendation.objects.filter(user=self.users['bob'], candidate=self.users['carol']).exists())
+
+    def test_parallel_scoring_matches_serial(self):
+        call_command('compute_follow_recommendations', workers=1, stdout=StringIO())
+        serial = set(FollowRecommendation.objects.values_list('user', 'candidate', 'score'))
+        call_command('compute_follow_recommendations', workers=2, chunk_size=2, stdout=StringIO())
+        self.assertEqual(set(FollowRecommendation.objects.values_list('user', 'candidate', 'score')), serial)
+
+    def test_followed_candidates_are_hidden(self):
+        call_command('compute_follow_recommendations', workers=1, stdout=StringIO())
+        self.users['alice'].following.add(self.users['dave'])
+        self.assertEqual(self.recommendations(), [('erin', 1)])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, AUTH_TOKEN_EXPIRY=3600)
+class CachedTokenAuthenticationTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.alice = CustomUser.objects.create_user(username='alice', password='testpass123')
+        response = self.client.post(reverse('login'), {'username': 'alice', 'password': 'testpass123'})
+        self.key = response.data['token']
+
+    def get_recommendations(self, key=None):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {key or self.key}')
+        return self.client.get(reverse('follow_recommendations'))
+
+    def test_token_lookup_is_cached(self):
+        self.assertEqual(self.get_recommendations().status_code, status.HTTP_200_OK)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.get_recommendations().status_code, status.HTTP_200_OK)
+        self.assertFalse(any('authtoken_token' in query['sql'] for query in queries.captured_queries))
+
+    def test_logout_invalidates_cached_token(self):
+        self.get_recommendations()
+        response = self.client.post(reverse('logout'))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.get_recommendations().status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_rotation_replaces_token(self):
+        self.get_recommendations()
+        response = self.client.post(reverse('token_rotate'))
+        new_key = response.data['token']
+        self.assertNotEqual(new_key, self.key)
+        self.assertEqual(self.get_recommendations().status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.get_recommendations(new_key).status_code, status.HTTP_200_OK)
+
+    def test_expired_token_is_rejected(self):
+        Token.objects.filter(key=self.key).update(created=Token.objects.get().created - timedelta(hours=2))
+        self.assertEqual(self.get_recommendations().status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertFalse(Token.objects.filter(key=self.key).exists())
+
+        # Logging in again issues a fresh token
+        response = self.client.post(reverse('login'), {'username': 'alice', 'password': 'testpass123'})
+        self.assertEqual(self.get_recommendations(response.data['token']).status_code, status.HTTP_200_OK)
+
+    def test_deactivation_applies_immediately(self):
+        self.get_recommendations()
+        self.alice.is_active = False
+        self.alice.save()
+        self.assertEqual(self.get_recommendations().status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class AuthThrottleTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        CustomUser.objects.create_user(username='alice', password='testpass123')
+
+    def login(self, username='alice', password='wrong', address='10.0.0.1'):
+        return self.client.post(
+            reverse('login'), {'username': username, 'password': password}, REMOTE_ADDR=address
+        )
+
+    @override_settings(REST_FRAMEWORK={'DEFAULT_THROTTLE_RATES': {
+        'login_ip': '100/min', 'login_username': '3/min', 'register_ip': '100/min',
+    }})
+    def test_username_throttle_spans_addresses(self):
+        for address in ('10.0.0.1', '10.0.0.2', '10.0.0.3'):
+            self.assertEqual(self.login(address=address).status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.login(username='ALICE', password='testpass123', address='10.0.0.4')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
+        # Other accounts are unaffected
+        self.assertEqual(self.login(username='bob').status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(REST_FRAMEWORK={'DEFAULT_THROTTLE_RATES': {
+        'login_ip': '2/min', 'login_username': '100/min', 'register_ip': '1/min',
+    }})
+    def test_ip_throttles(self):
+        self.login(username='a')
+        self.login(username='b')
+        self.assertEqual(self.login(username='c').status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(self.login(username='c', address='10.0.0.9').status_code, status.HTTP_400_BAD_REQUEST)
+
+        payload = {'username': 'carol', 'email': 'carol@example.com', 'password': 'testpass123'}
+        self.assertEqual(self.client.post(reverse('register'), payload).status_code, status.HTTP_201_CREATED)
+        payload['username'] = 'dave'
+        self.assertEqual(self.client.post(reverse('register'), payload).status_code, status.HTTP_429_TOO_MANY_REQUESTS)
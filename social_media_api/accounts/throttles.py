@@ -0,0 +1,44 @@
+# accounts/throttles.py
+#
+# Throttles for the AllowAny endpoints that hash passwords. DRF checks throttles in
+# APIView.initial(), before the handler runs, so a rejected attempt costs a cache
+# round trip instead of a PBKDF2 computation. Each throttle keeps a sliding window of
+# request timestamps in the default cache; rates live in
+# REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] under the throttle's scope.
+
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class SettingsRateThrottle(SimpleRateThrottle):
+    """SimpleRateThrottle that reads its rate when the throttle is built, not at import."""
+
+    def get_rate(self):
+        return api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+
+
+class IPRateThrottle(SettingsRateThrottle):
+    """Limits attempts per client address (REMOTE_ADDR, or X-Forwarded-For per NUM_PROXIES)."""
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class LoginIPThrottle(IPRateThrottle):
+    scope = 'login_ip'
+
+
+class RegisterIPThrottle(IPRateThrottle):
+    scope = 'register_ip'
+
+
+class LoginUsernameThrottle(SettingsRateThrottle):
+    """Limits attempts against one account, whichever addresses they come from."""
+
+    scope = 'login_username'
+
+    def get_cache_key(self, request, view):
+        username = request.data.get('username')
+        if not isinstance(username, str) or not username.strip():
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': username.strip().lower()}
@@ -2,7 +2,15 @@
 
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import RegisterView, LoginView, ProfileView, FollowViewSet
+from .views import (
+    FollowViewSet,
+    LoginView,
+    LogoutView,
+    ProfileView,
+    RecommendationListView,
+    RegisterView,
+    RotateTokenView,
+)
 
 # New Router for FollowViewSet
 router = DefaultRouter()
@@ -12,7 +20,10 @@ urlpatterns = [
     # Authentication endpoints
     path('register/', RegisterView.as_view(), name='register'),
     path('login/', LoginView.as_view(), name='login'),
+    path('logout/', LogoutView.as_view(), name='logout'),
+    path('token/rotate/', RotateTokenView.as_view(), name='token_rotate'),
     path('profile/', ProfileView.as_view(), name='profile'),
+    path('recommendations/', RecommendationListView.as_view(), name='follow_recommendations'),
     
   
     path(
@@ -1,12 +1,25 @@
 from rest_framework import generics, permissions, status, viewsets
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import authenticate
-from .models import CustomUser
-from .serializers import UserCreateSerializer, UserSerializer
-from django.shortcuts import get_object_or_404
+from .authentication import issue_token, revoke_token, rotate_token
+from .models import CustomUser, FollowRecommendation
+from .throttles import LoginIPThrottle, LoginUsernameThrottle, RegisterIPThrottle
+from .serializers import (
+    BulkFollowSerializer,
+    FollowRecommendationSerializer,
+    UserCreateSerializer,
+    UserSerializer,
+)
+from rest_framework.generics import get_object_or_404
 from rest_framework.decorators import action
+from notifications.models import Verb
 from notifications.utils import create_notification
+from posts.pagination import KeysetPagination
+from posts.timeline import backfill_timeline, prune_timeline
 
 # --- Registration View ---
 class RegisterView(generics.CreateAPIView):
@@ -15,6 +28,10 @@ class RegisterView(generics.CreateAPIView):
     queryset = CustomUser.objects.all()
     serializer_class = UserCreateSerializer
     permission_classes = [permissions.AllowAny]
+    # A stale or expired token header must not block getting a new one
+    authentication_classes = []
+    # Checked before the password is hashed
+    throttle_classes = [RegisterIPThrottle]
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -36,6 +53,8 @@ class LoginView(generics.GenericAPIView):
 
     serializer_class = UserSerializer
     permission_classes = [permissions.AllowAny]
+    authentication_classes = []
+    throttle_classes = [LoginIPThrottle, LoginUsernameThrottle]
 
     def post(self, request, *args, **kwargs):
         username = request.data.get("username")
@@ -44,7 +63,7 @@ class LoginView(generics.GenericAPIView):
         user = authenticate(request, username=username, password=password)
 
         if user is not None:
-            token, created = Token.objects.get_or_create(user=user)
+            token = issue_token(user)
             return Response(
                 {"token": token.key, "username": user.username},
                 status=status.HTTP_200_OK,
@@ -64,9 +83,142 @@ class ProfileView(generics.RetrieveUpdateAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
-        # Ensure only the currently authenticated user can view/edit their profile
-        return self.request.user
-    
+        # Ensure only the currently authenticated user can view/edit their profile.
+        # Re-read it: request.user may come from the token cache and carry stale counters.
+        return CustomUser.objects.get(pk=self.request.user.pk)
+
+
+# --- Logout View ---
+class LogoutView(generics.GenericAPIView):
+    """Deletes the caller's token; it stops authenticating immediately."""
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        if isinstance(request.auth, Token):
+            revoke_token(request.auth)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+# --- Token Rotation View ---
+class RotateTokenView(generics.GenericAPIView):
+    """Replaces the caller's token with a new one and returns it."""
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        token = rotate_token(request.user)
+        return Response({"token": token.key}, status=status.HTTP_200_OK)
+
+
+# --- "Who to follow" View ---
+class RecommendationListView(generics.ListAPIView):
+    """
+    Friends-of-friends suggestions ranked by mutual follows. Reads only the table
+    precomputed by the compute_follow_recommendations command.
+    """
+
+    serializer_class = FollowRecommendationSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    max_limit = 50
+
+    def get_queryset(self):
+        try:
+            limit = min(int(self.request.query_params.get('limit', 20)), self.max_limit)
+        except ValueError:
+            limit = 20
+        return (
+            FollowRecommendation.objects.filter(user=self.request.user)
+            # Drop candidates followed since the last offline run
+            .exclude(candidate__followers=self.request.user)
+            .select_related('candidate')
+            .order_by('-score', 'candidate_id')[:max(limit, 1)]
+        )
+
+
+# --- Follow graph helpers ---
+# All membership checks and writes go straight to the indexed through table
+# (unique on followee/follower), so they cost the same however many followers
+# an account has. Counters, timelines and notifications are only touched for
+# edges that actually changed.
+Follow = CustomUser.followers.through
+
+
+def _create_edge(target, follower):
+    """Inserts one follow edge; False if it already exists (e.g. a concurrent double-tap won)."""
+    try:
+        with transaction.atomic():
+            Follow.objects.create(from_customuser=target, to_customuser=follower)
+    except IntegrityError:
+        return False
+    return True
+
+
+def follow_users(follower, targets):
+    """Makes ``follower`` follow every user in ``targets``; returns the newly followed users."""
+    targets = [target for target in targets if target.pk != follower.pk]
+    if not targets:
+        return []
+
+    # The existence check and the insert share a transaction, and counters and
+    # notifications follow only the edges this call actually inserted
+    with transaction.atomic():
+        existing = set(
+            Follow.objects.filter(
+                from_customuser__in=targets, to_customuser=follower
+            ).values_list('from_customuser_id', flat=True)
+        )
+        new = [target for target in targets if target.pk not in existing]
+        if not new:
+            return []
+        try:
+            with transaction.atomic():
+                Follow.objects.bulk_create(
+                    [Follow(from_customuser=target, to_customuser=follower) for target in new]
+                )
+        except IntegrityError:
+            # A concurrent follow inserted some of these edges first
+            new = [target for target in new if _create_edge(target, follower)]
+            if not new:
+                return []
+
+        CustomUser.objects.filter(pk__in=[target.pk for target in new]).update(
+            followers_count=F('followers_count') + 1
+        )
+        CustomUser.objects.filter(pk=follower.pk).update(following_count=F('following_count') + len(new))
+        for target in new:
+            create_notification(recipient=target, actor=follower, verb=Verb.FOLLOWED, target=follower)
+
+    backfill_timeline(follower, *new)
+    return new
+
+
+def unfollow_users(follower, targets):
+    """Makes ``follower`` stop following every user in ``targets``; returns the unfollowed users."""
+    with transaction.atomic():
+        # Locking the edges makes a concurrent unfollow wait and then find them gone
+        edges = dict(
+            Follow.objects.select_for_update()
+            .filter(from_customuser__in=targets, to_customuser=follower)
+            .values_list('pk', 'from_customuser_id')
+        )
+        if not edges:
+            return []
+        deleted, _ = Follow.objects.filter(pk__in=edges).delete()
+        removed_ids = set(edges.values())
+        # Clamped at zero: drifted counters are left for reconcile_counters to fix
+        CustomUser.objects.filter(pk__in=removed_ids).update(
+            followers_count=Greatest(F('followers_count') - 1, 0)
+        )
+        CustomUser.objects.filter(pk=follower.pk).update(
+            following_count=Greatest(F('following_count') - deleted, 0)
+        )
+
+    removed = [target for target in targets if target.pk in removed_ids]
+    prune_timeline(follower, *removed)
+    return removed
+
+
 # --- New: Follow Management ViewSet ---
 class FollowViewSet(viewsets.GenericViewSet):
     """Provides actions for users to follow and unfollow other users."""
@@ -85,19 +237,9 @@ class FollowViewSet(viewsets.GenericViewSet):
         if follower == user_to_follow:
             return Response({"detail": "You cannot follow yourself."}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Check if already following (uses the 'following' related_name)
-        if user_to_follow in follower.following.all():
+        if not follow_users(follower, [user_to_follow]):
             return Response({"detail": f"You are already following {user_to_follow.username}."}, status=status.HTTP_400_BAD_REQUEST)
 
-        create_notification(
-            recipient=user_to_follow, 
-            actor=follower, 
-            verb='started following you', 
-            target=follower 
-        )
-        follower.following.add(user_to_follow) 
-        follower.save()
-
         return Response({"detail": f"You are now following {user_to_follow.username}."}, status=status.HTTP_200_OK)
     
    
@@ -110,13 +252,52 @@ class FollowViewSet(viewsets.GenericViewSet):
         if follower == user_to_unfollow:
             return Response({"detail": "You cannot unfollow yourself."}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Check if following
-        if user_to_unfollow not in follower.following.all():
+        if not unfollow_users(follower, [user_to_unfollow]):
             return Response({"detail": f"You are not following {user_to_unfollow.username}."}, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Remove user_to_unfollow from the follower's 'following' list.
-        follower.following.remove(user_to_unfollow)
-        follower.save()
 
         return Response({"detail": f"You have unfollowed {user_to_unfollow.username}."}, status=status.HTTP_200_OK)
-    
+
+    # Map to: /auth/users/bulk-follow/ and /auth/users/bulk-unfollow/
+    # Body: {"ids": [...]} and/or {"usernames": [...]}
+    @action(detail=False, methods=['post'], url_path='bulk-follow')
+    def bulk_follow(self, request):
+        targets = self._bulk_targets(request)
+        followed = follow_users(request.user, targets)
+        return Response({"followed": [user.username for user in followed]}, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'], url_path='bulk-unfollow')
+    def bulk_unfollow(self, request):
+        targets = self._bulk_targets(request)
+        unfollowed = unfollow_users(request.user, targets)
+        return Response({"unfollowed": [user.username for user in unfollowed]}, status=status.HTTP_200_OK)
+
+    def _bulk_targets(self, request):
+        serializer = BulkFollowSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        lookup = Q(pk__in=serializer.validated_data.get('ids', [])) | Q(
+            username__in=serializer.validated_data.get('usernames', [])
+        )
+        return list(CustomUser.objects.filter(lookup).only('id', 'username'))
+
+    # Map to: /auth/users/{pk}/followers/ and /auth/users/{pk}/following/
+    # Cursor-paginated straight off the through table, newest ids first.
+    @action(detail=True, methods=['get'])
+    def followers(self, request, pk=None):
+        user = get_object_or_404(CustomUser.objects.only('id'), pk=pk)
+        edges = Follow.objects.filter(from_customuser_id=user.pk).select_related('to_customuser')
+        return self._paginate_edges(edges, 'to_customuser')
+
+    @action(detail=True, methods=['get'])
+    def following(self, request, pk=None):
+        user = get_object_or_404(CustomUser.objects.only('id'), pk=pk)
+        edges = Follow.objects.filter(to_customuser_id=user.pk).select_related('from_customuser')
+        return self._paginate_edges(edges, 'from_customuser')
+
+    def _paginate_edges(self, edges, side):
+        # Key pages on the edge's own id (newest follows first): each side's foreign
+        # key index carries the rowid, so both directions are read in index order
+        self.cursor_ordering = ('-id',)
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(edges, self.request, view=self)
+        serializer = UserSerializer([getattr(edge, side) for edge in page], many=True)
+        return paginator.get_paginated_response(serializer.data)
@@ -0,0 +1,154 @@
+# notifications/async_views.py
+#
+# Async variants of the notification list and unread count (see posts.async_views),
+# and the Server-Sent Events stream that pushes notifications as they are written.
+
+import asyncio
+import functools
+import json
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework.utils.encoders import JSONEncoder
+
+from accounts.authentication import async_token_required
+from posts.async_views import api_response, handle_api_exceptions
+from .hub import get_hub
+from .models import Notification
+from .serializers import NotificationSerializer
+from .views import NotificationListView
+
+
+@require_GET
+@async_token_required
+@handle_api_exceptions
+async def notification_list(request):
+    """Async NotificationListView."""
+    view = NotificationListView(request=request, args=(), kwargs={}, format_kwarg=None)
+    paginator = view.pagination_class()
+    # Targets are batch-loaded by aiterator()'s prefetch, which also warms the
+    # ContentType cache the serializer reads target types from
+    page = await paginator.apaginate_queryset(view.get_queryset(), request, view)
+
+    serializer = NotificationSerializer(page, many=True, context=view.get_serializer_context())
+    return api_response(paginator.get_paginated_response(serializer.data).data)
+
+
+@require_GET
+@async_token_required
+async def unread_count(request):
+    """Async UnreadCountView."""
+    unread = await Notification.objects.filter(recipient=request.user, is_read=False).acount()
+    return api_response({'unread_count': unread})
+
+
+# --- Server-Sent Events stream ---
+
+# Milliseconds a disconnected client waits before reconnecting
+STREAM_RETRY = 3000
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def event_id(notification):
+    """
+    "<timestamp in microseconds>-<notification id>". Merging bumps a notification's
+    timestamp but keeps its id, so the pair (not the id alone) orders events.
+    """
+    return f"{(notification.timestamp - EPOCH) // MICROSECOND}-{notification.pk}"
+
+
+def parse_event_id(value):
+    """(timestamp, notification id) from an event id, or None if it isn't one."""
+    timestamp, _, pk = value.partition('-')
+    try:
+        return EPOCH + int(timestamp) * MICROSECOND, int(pk)
+    except (ValueError, OverflowError):
+        return None
+
+
+def format_event(notification, record):
+    return (
+        f"id: {event_id(notification)}\nevent: notification\n"
+        f"data: {json.dumps(record, cls=JSONEncoder)}\n\n"
+    )
+
+
+async def load_events(view, *conditions, **filters):
+    """The recipient's notifications matching the filters as SSE events, oldest first."""
+    queryset = view.get_queryset().filter(*conditions, **filters).order_by('timestamp', 'id')
+    rows = [notification async for notification in queryset.aiterator(chunk_size=100)]
+    records = NotificationSerializer(rows, many=True, context=view.get_serializer_context()).data
+    return [format_event(notification, record) for notification, record in zip(rows, records)]
+
+
+async def event_stream(view, last_event):
+    subscription = get_hub().subscribe(view.request.user.pk)
+    keepalive = getattr(settings, 'NOTIFICATIONS_STREAM_KEEPALIVE', 15)
+    try:
+        # Subscribed before replaying, so nothing written in between is missed
+        yield f"retry: {STREAM_RETRY}\n\n"
+        if last_event is not None:
+            # Everything created or merged into since the last event the client saw
+            timestamp, pk = last_event
+            after = Q(timestamp__gt=timestamp) | Q(timestamp=timestamp, id__gt=pk)
+            for event in await load_events(view, after, is_read=False):
+                yield event
+
+        while True:
+            try:
+                notification_id = await asyncio.wait_for(subscription.get(), timeout=keepalive)
+            except asyncio.TimeoutError:
+                # Comment line: keeps proxies from closing an idle connection
+                yield ": keepalive\n\n"
+                continue
+            for event in await load_events(view, pk=notification_id):
+                yield event
+    finally:
+        subscription.close()
+
+
+def asgi_only(view_func):
+    """
+    Answers 501 unless the request is served under ASGI. A WSGI server drains a
+    streaming response's async iterator into a list before sending anything, so an
+    endless stream would hang the request forever.
+    """
+
+    @functools.wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        if not isinstance(request, ASGIRequest):
+            return api_response(
+                {'detail': 'The notification stream is only served under ASGI.'}, status=501
+            )
+        return await view_func(request, *args, **kwargs)
+
+    return wrapper
+
+
+@require_GET
+@asgi_only
+@async_token_required
+async def notification_stream(request):
+    """
+    Pushes the user's notifications over one long-lived text/event-stream response.
+    Each event's id is the notification's timestamp and id (see event_id); a merged
+    notification ("bob and 2 others liked your post") is re-sent with the same data id
+    and a later event id. Reconnecting clients send Last-Event-ID and first receive the
+    unread notifications created or merged into after it.
+    """
+    view = NotificationListView(request=request, args=(), kwargs={}, format_kwarg=None)
+    last_event = parse_event_id(request.headers.get('Last-Event-ID', ''))
+
+    response = StreamingHttpResponse(
+        event_stream(view, last_event), content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,91 @@
+# notifications/hub.py
+#
+# Pub/sub hub behind the notification stream (notifications.async_views). The pipeline
+# publishes the id of every notification it writes to the recipient's channel and each
+# open stream subscribed to that channel loads and pushes the row. The backend is
+# chosen by the NOTIFICATIONS_HUB setting; a backend only needs:
+#
+#   publish(user_id, notification_id)   callable from any thread
+#   subscribe(user_id) -> subscription  called from the stream's event loop, where the
+#                                       subscription has ``async get()`` (next id)
+#                                       and ``close()``
+#
+# LocalHub only reaches streams served by the same process; with several worker
+# processes plug in a backend over a shared broker (e.g. Redis pub/sub) instead.
+
+import asyncio
+import functools
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class LocalSubscription:
+    def __init__(self, hub, user_id, maxsize):
+        self.hub = hub
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize)
+
+    def deliver(self, message):
+        """Hands ``message`` to the subscriber's event loop; safe from any thread."""
+        try:
+            self.loop.call_soon_threadsafe(self._put, message)
+        except RuntimeError:
+            # The stream's loop has shut down; it will unsubscribe on its way out
+            pass
+
+    def _put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            logger.warning("Dropped a notification for slow stream of user ID %s", self.user_id)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class LocalHub:
+    """In-process hub: subscriptions are per-user asyncio queues fed across threads."""
+
+    def __init__(self, maxsize=100):
+        self.maxsize = maxsize
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        subscription = LocalSubscription(self, user_id, self.maxsize)
+        with self._lock:
+            self._subscriptions[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.user_id]
+
+    def publish(self, user_id, message):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(user_id, ()))
+        for subscription in subscriptions:
+            subscription.deliver(message)
+
+
+@functools.lru_cache(maxsize=None)
+def _load_hub(path):
+    return import_string(path)()
+
+
+def get_hub():
+    return _load_hub(getattr(settings, 'NOTIFICATIONS_HUB', 'notifications.hub.LocalHub'))
@@ -0,0 +1,102 @@
+# Converts Notification.verb from free text to a small-integer code, widens
+# target_object_id to match the BigAutoField primary keys and adds the
+# (recipient, is_read, -timestamp) index.
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+# Frozen copy of notifications.models.Verb at the time of this migration
+VERB_CODES = {
+    'liked your post': 1,
+    'commented on your post': 2,
+    'started following you': 3,
+}
+
+
+def _code_for(verb):
+    # Exact matches only: guessing from substrings would turn e.g. "unliked" into a like
+    return VERB_CODES.get(verb)
+
+
+def _chunks(Notification):
+    """Yields (low, high) primary-key ranges of at most BATCH_SIZE rows."""
+    ids = Notification.objects.order_by('pk').values_list('pk', flat=True)
+    last = 0
+    while True:
+        batch = list(ids.filter(pk__gt=last)[:BATCH_SIZE])
+        if not batch:
+            return
+        yield batch[0], batch[-1]
+        last = batch[-1]
+
+
+def verbs_to_codes(apps, schema_editor):
+    Notification = apps.get_model('notifications', 'Notification')
+    # Unrecognised verbs have no code; refuse to migrate rather than lose those rows
+    verbs = Notification.objects.order_by().values_list('verb', flat=True).distinct()
+    unknown = sorted(verb for verb in verbs if _code_for(verb) is None)
+    if unknown:
+        raise RuntimeError(
+            f"Notifications with unrecognised verbs: {', '.join(map(repr, unknown))}. "
+            "Add them to VERB_CODES in this migration, or update/delete those rows, "
+            "then migrate again."
+        )
+
+    for low, high in _chunks(Notification):
+        chunk = Notification.objects.filter(pk__range=(low, high))
+        for verb in chunk.values_list('verb', flat=True).distinct():
+            chunk.filter(verb=verb).update(verb_code=_code_for(verb))
+
+
+def codes_to_verbs(apps, schema_editor):
+    Notification = apps.get_model('notifications', 'Notification')
+    for low, high in _chunks(Notification):
+        chunk = Notification.objects.filter(pk__range=(low, high))
+        for verb, code in VERB_CODES.items():
+            chunk.filter(verb_code=code).update(verb=verb)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0002_notification_actor_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='verb_code',
+            field=models.SmallIntegerField(choices=[(1, 'liked your post'), (2, 'commented on your post'), (3, 'started following you')], null=True),
+        ),
+        migrations.RunPython(verbs_to_codes, codes_to_verbs),
+        # Give the old column a default so that a rollback can re-add it to a populated table
+        migrations.AlterField(
+            model_name='notification',
+            name='verb',
+            field=models.CharField(default='', max_length=255),
+        ),
+        migrations.RemoveField(
+            model_name='notification',
+            name='verb',
+        ),
+        migrations.RenameField(
+            model_name='notification',
+            old_name='verb_code',
+            new_name='verb',
+        ),
+        migrations.AlterField(
+            model_name='notification',
+            name='verb',
+            field=models.SmallIntegerField(choices=[(1, 'liked your post'), (2, 'commented on your post'), (3, 'started following you')]),
+        ),
+        migrations.AlterField(
+            model_name='notification',
+            name='target_object_id',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', 'is_read', '-timestamp'], name='notif_recipient_unread_idx'),
+        ),
+    ]
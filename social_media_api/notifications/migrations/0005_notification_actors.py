@@ -0,0 +1,46 @@
+# Adds NotificationActor, the distinct actors counted into each aggregated notification.
+# Existing rows only know their latest actor, so that is all the backfill records.
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def record_latest_actors(apps, schema_editor):
+    Notification = apps.get_model('notifications', 'Notification')
+    NotificationActor = apps.get_model('notifications', 'NotificationActor')
+    rows = Notification.objects.order_by('pk').values_list('pk', 'actor_id')
+    last = 0
+    while True:
+        batch = list(rows.filter(pk__gt=last)[:BATCH_SIZE])
+        if not batch:
+            return
+        NotificationActor.objects.bulk_create(
+            NotificationActor(notification_id=pk, actor_id=actor_id) for pk, actor_id in batch
+        )
+        last = batch[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0004_hot_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationActor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('actor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('notification', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='actor_links', to='notifications.notification')),
+            ],
+            options={
+                'unique_together': {('notification', 'actor')},
+            },
+        ),
+        migrations.RunPython(record_latest_actors, migrations.RunPython.noop),
+    ]
@@ -7,6 +7,15 @@ from django.contrib.contenttypes.models import ContentType
 
 User = settings.AUTH_USER_MODEL
 
+
+class Verb(models.IntegerChoices):
+    """Notification verbs, stored as a small integer; the display text lives only in Python."""
+
+    LIKED = 1, 'liked your post'
+    COMMENTED = 2, 'commented on your post'
+    FOLLOWED = 3, 'started following you'
+
+
 class Notification(models.Model):
     # Who should receive the notification
     recipient = models.ForeignKey(
@@ -22,8 +31,12 @@ class Notification(models.Model):
         related_name='sent_notifications'
     )
     
+    # How many actors this row aggregates ("alice and 41 others liked your post").
+    # Bursts on the same recipient/verb/target are coalesced by notifications.pipeline.
+    actor_count = models.PositiveIntegerField(default=1)
+
     # What kind of action occurred (e.g., 'liked', 'commented', 'followed')
-    verb = models.CharField(max_length=255)
+    verb = models.SmallIntegerField(choices=Verb.choices)
     
     target_content_type = models.ForeignKey(
         ContentType, 
@@ -32,7 +45,7 @@ class Notification(models.Model):
         blank=True
     )
     # 2. Stores the primary key of the object
-    target_object_id = models.PositiveIntegerField(null=True, blank=True)
+    target_object_id = models.PositiveBigIntegerField(null=True, blank=True)
     # 3. The actual Generic Foreign Key field
     target = GenericForeignKey('target_content_type', 'target_object_id')
     
@@ -41,6 +54,46 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            # Serves the unread count and unread-first scans of a recipient's inbox
+            models.Index(
+                fields=['recipient', 'is_read', '-timestamp'],
+                name='notif_recipient_unread_idx'
+            ),
+            # The inbox itself: a recipient's notifications, newest first, by (timestamp, id) cursor
+            models.Index(
+                fields=['recipient', '-timestamp', '-id'],
+                name='notif_recipient_time_idx'
+            ),
+        ]
+
+    @property
+    def summary(self):
+        others = self.actor_count - 1
+        if others <= 0:
+            return f'{self.actor.username} {self.get_verb_display()}'
+        return f"{self.actor.username} and {others} other{'s' if others > 1 else ''} {self.get_verb_display()}"
 
     def __str__(self):
-        return f'{self.actor.username} {self.verb} {self.target}'
\ No newline at end of file
+        return f'{self.actor.username} {self.get_verb_display()} {self.target}'
+
+
+class NotificationActor(models.Model):
+    """
+    One distinct actor counted into an aggregated notification, so repeated actions by
+    the same user (like, unlike, like again) don't inflate ``actor_count``.
+    """
+
+    notification = models.ForeignKey(
+        Notification,
+        on_delete=models.CASCADE,
+        related_name='actor_links'
+    )
+    actor = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+
+    class Meta:
+        unique_together = ('notification', 'actor')
@@ -0,0 +1,184 @@
+# notifications/pipeline.py
+#
+# Notification writes are taken off the request path: create_notification() only queues
+# a NotificationEvent once the request's transaction commits, and a background worker
+# drains the queue in batches. Each batch coalesces events on the same
+# (recipient, verb, target) into one aggregated row ("alice and 41 others liked your
+# post"), merging into a still-unread row when one exists, and inserts the rest with a
+# single bulk_create. Each row's counted actors are kept in NotificationActor, so a
+# user repeating an action (like, unlike, like again) is only counted once. A batch is
+# written in one transaction, and merges add to actor_count with F() so concurrent
+# writers (one worker per process) don't overwrite each other's counts. Once written,
+# each notification's id is published to its recipient's channel on the pub/sub hub
+# (notifications.hub) for open streams.
+
+import atexit
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .hub import get_hub
+from .models import Notification, NotificationActor
+
+logger = logging.getLogger(__name__)
+
+NotificationEvent = namedtuple(
+    'NotificationEvent',
+    ['recipient_id', 'actor_id', 'verb', 'target_content_type_id', 'target_object_id'],
+)
+
+
+def coalesce(events):
+    """Groups events by (recipient, verb, target), keeping each group's distinct actors in order."""
+    groups = OrderedDict()
+    for event in events:
+        key = (event.recipient_id, event.verb, event.target_content_type_id, event.target_object_id)
+        actors = groups.setdefault(key, [])
+        if event.actor_id in actors:
+            actors.remove(event.actor_id)
+        actors.append(event.actor_id)
+    return groups
+
+
+def write_events(events):
+    """Persists a batch of events, merging into unread rows and bulk-inserting the remainder."""
+    groups = coalesce(events)
+    if not groups:
+        return []
+    with transaction.atomic():
+        return _write_groups(groups)
+
+
+def _write_groups(groups):
+    match = Q()
+    for recipient_id, verb, content_type_id, object_id in groups:
+        match |= Q(
+            recipient_id=recipient_id, verb=verb,
+            target_content_type_id=content_type_id, target_object_id=object_id,
+        )
+    # Locked (where the database supports it) so the links read next stay accurate
+    existing = {
+        (n.recipient_id, n.verb, n.target_content_type_id, n.target_object_id): n
+        for n in Notification.objects.select_for_update().filter(match, is_read=False)
+    }
+
+    counted = set(
+        NotificationActor.objects.filter(
+            notification__in=existing.values(),
+            actor_id__in={actor for actors in groups.values() for actor in actors},
+        ).values_list('notification_id', 'actor_id')
+    )
+
+    now = timezone.now()
+    updated, created, links = [], [], []
+    for key, actors in groups.items():
+        notification = existing.get(key)
+        if notification is not None:
+            new = [actor for actor in actors if (notification.pk, actor) not in counted]
+            if not new:
+                # Only repeats of actors already in the row
+                continue
+            notification.actor_id = new[-1]
+            notification.actor_count = F('actor_count') + len(new)
+            notification.timestamp = now
+            updated.append(notification)
+            links += [NotificationActor(notification=notification, actor_id=actor) for actor in new]
+        else:
+            recipient_id, verb, content_type_id, object_id = key
+            created.append(Notification(
+                recipient_id=recipient_id, actor_id=actors[-1], actor_count=len(actors), verb=verb,
+                target_content_type_id=content_type_id, target_object_id=object_id,
+            ))
+
+    Notification.objects.bulk_update(updated, ['actor', 'actor_count', 'timestamp'])
+    created = Notification.objects.bulk_create(created)
+    for notification, actors in zip(created, (groups[key] for key in groups if key not in existing)):
+        links += [NotificationActor(notification=notification, actor_id=actor) for actor in actors]
+    NotificationActor.objects.bulk_create(links, ignore_conflicts=True)
+    return updated + created
+
+
+def write_and_publish(events):
+    """Writes a batch, then announces every new or merged row to its recipient's streams."""
+    notifications = write_events(events)
+    hub = get_hub()
+    for notification in notifications:
+        hub.publish(notification.recipient_id, notification.pk)
+    return notifications
+
+
+class NotificationPipeline:
+    """
+    Single-writer queue for notification events. With NOTIFICATIONS_ASYNC disabled (as in
+    tests or management commands) events are written inline when submitted.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+
+    @property
+    def batch_size(self):
+        return getattr(settings, 'NOTIFICATIONS_BATCH_SIZE', 500)
+
+    @property
+    def flush_interval(self):
+        return getattr(settings, 'NOTIFICATIONS_FLUSH_INTERVAL', 0.5)
+
+    def submit(self, event):
+        if not getattr(settings, 'NOTIFICATIONS_ASYNC', True):
+            write_and_publish([event])
+            return
+        self._queue.put(event)
+        self._ensure_worker()
+
+    def flush(self):
+        """Synchronously writes everything queued so far (used at shutdown)."""
+        events = []
+        while True:
+            try:
+                events.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if events:
+            write_and_publish(events)
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run, name='notification-pipeline', daemon=True
+                )
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            # Keep collecting for one flush interval so bursts land in the same batch
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            close_old_connections()
+            try:
+                write_and_publish(batch)
+            except Exception:
+                logger.exception("Dropped a batch of %d notification events", len(batch))
+
+
+pipeline = NotificationPipeline()
+atexit.register(pipeline.flush)
@@ -1,4 +1,5 @@
 
+from django.contrib.contenttypes.models import ContentType
 from rest_framework import serializers
 from .models import Notification
 from accounts.serializers import UserSerializer 
@@ -7,17 +8,42 @@ class NotificationSerializer(serializers.ModelSerializer):
     actor = UserSerializer(read_only=True)
     # Since target is a GenericForeignKey, we serialize just enough info
     target_type = serializers.SerializerMethodField()
+    target = serializers.SerializerMethodField()
     target_id = serializers.ReadOnlyField(source='target_object_id')
+    summary = serializers.ReadOnlyField()
+    # verb is stored as a Verb code; clients get its text plus the stable code
+    verb = serializers.CharField(source='get_verb_display', read_only=True)
+    verb_code = serializers.IntegerField(source='verb', read_only=True)
 
     class Meta:
         model = Notification
         fields = [
-            'id', 'recipient', 'actor', 'verb', 'timestamp', 'is_read',
-            'target_type', 'target_id'
+            'id', 'recipient', 'actor', 'actor_count', 'verb', 'verb_code', 'summary', 'timestamp',
+            'is_read', 'target_type', 'target_id', 'target'
         ]
         read_only_fields = fields
 
     def get_target_type(self, obj):
-        if obj.target:
-            return obj.target.__class__.__name__
-        return None
\ No newline at end of file
+        # Resolved from ContentType's in-process cache, never by loading the target
+        if obj.target_content_type_id is None:
+            return None
+        model = ContentType.objects.get_for_id(obj.target_content_type_id).model_class()
+        return model.__name__ if model else None
+
+    def get_target(self, obj):
+        """Compact summary of the (prefetched) target: id, type and a display title."""
+        target = obj.target
+        if target is None:
+            return None
+        return {
+            'id': target.pk,
+            'type': target.__class__.__name__,
+            'title': getattr(target, 'title', None) or str(target),
+        }
+
+class MarkReadSerializer(serializers.Serializer):
+    # High-water mark: the id and timestamp of the newest notification the client has
+    # seen. The list is ordered by (timestamp, id) and merges move a row's timestamp
+    # but keep its id, so the id alone doesn't say what was seen.
+    up_to = serializers.IntegerField(min_value=1)
+    timestamp = serializers.DateTimeField()
@@ -1,3 +1,335 @@
-from django.test import TestCase
+# notifications/tests.py
 
-# Create your tests here.
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync, sync_to_async
+
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import AsyncRequestFactory, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from posts.models import Post
+from . import async_views
+from .models import Notification, Verb
+from .pipeline import NotificationEvent, pipeline, write_events
+from .serializers import NotificationSerializer
+from .utils import create_notification
+
+User = get_user_model()
+
+
+class NotificationPipelineTestCase(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='testpass123')
+        self.fans = [
+            User.objects.create_user(username=f'fan{i}', password='testpass123') for i in range(3)
+        ]
+        self.post = Post.objects.create(author=self.owner, title='Hot', content='x')
+        self.post_type = ContentType.objects.get_for_model(Post)
+
+    def like_event(self, fan):
+        return NotificationEvent(self.owner.pk, fan.pk, Verb.LIKED, self.post_type.pk, self.post.pk)
+
+    def test_burst_is_coalesced_into_one_row(self):
+        write_events([self.like_event(fan) for fan in self.fans])
+
+        notification = Notification.objects.get()
+        self.assertEqual(notification.actor_count, 3)
+        self.assertEqual(notification.actor, self.fans[-1])
+        self.assertEqual(notification.summary, 'fan2 and 2 others liked your post')
+
+    def test_later_burst_merges_into_unread_row(self):
+        write_events([self.like_event(self.fans[0])])
+        write_events([self.like_event(self.fans[1])])
+        self.assertEqual(Notification.objects.get().actor_count, 2)
+
+        Notification.objects.update(is_read=True)
+        write_events([self.like_event(self.fans[2])])
+        self.assertEqual(Notification.objects.count(), 2)
+
+    def test_repeat_actor_is_counted_once(self):
+        # like, unlike, like again: each like re-emits the same event
+        for _ in range(3):
+            write_events([self.like_event(self.fans[0])])
+        notification = Notification.objects.get()
+        self.assertEqual(notification.actor_count, 1)
+        self.assertEqual(notification.summary, 'fan0 liked your post')
+
+        write_events([self.like_event(self.fans[1]), self.like_event(self.fans[0])])
+        notification.refresh_from_db()
+        self.assertEqual(notification.actor_count, 2)
+        self.assertEqual(notification.actor, self.fans[1])
+
+    @override_settings(NOTIFICATIONS_ASYNC=False)
+    def test_create_notification_writes_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            create_notification(self.owner, self.fans[0], Verb.LIKED, self.post)
+            self.assertFalse(Notification.objects.exists())
+        self.assertTrue(Notification.objects.filter(recipient=self.owner).exists())
+
+    def test_self_actions_are_not_notified(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            create_notification(self.owner, self.owner, Verb.LIKED, self.post)
+        self.assertEqual(callbacks, [])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, NOTIFICATIONS_ASYNC=False)
+class CommentNotificationTestCase(APITestCase):
+    def test_comment_notifies_post_author(self):
+        owner = User.objects.create_user(username='owner', password='testpass123')
+        fan = User.objects.create_user(username='fan', password='testpass123')
+        post = Post.objects.create(author=owner, title='Hot', content='x')
+
+        self.client.force_authenticate(fan)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('post-comments', args=[post.pk]), {'content': 'Nice'})
+
+        notification = Notification.objects.get(recipient=owner)
+        self.assertEqual((notification.actor, notification.target), (fan, post))
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class NotificationEndpointsTestCase(APITestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='testpass123')
+        fan = User.objects.create_user(username='fan', password='testpass123')
+        self.notifications = Notification.objects.bulk_create(
+            Notification(recipient=self.owner, actor=fan, verb=Verb.FOLLOWED) for _ in range(3)
+        )
+        self.client.force_authenticate(self.owner)
+
+    def test_list_is_cursor_paginated_and_read_only(self):
+        response = self.client.get(reverse('notification_list') + '?page_size=2')
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNotNone(response.data['next'])
+        self.assertNotIn('count', response.data)
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(Notification.objects.filter(is_read=False).count(), 3)
+
+    def mark_read(self, notification):
+        """Posts the high-water mark the client would take from ``notification`` in the list."""
+        seen = NotificationSerializer(notification).data
+        return self.client.post(
+            reverse('notification_mark_read'), {'up_to': seen['id'], 'timestamp': seen['timestamp']}
+        )
+
+    def test_mark_read_up_to_high_water_mark(self):
+        response = self.mark_read(self.notifications[1])
+        self.assertEqual(response.data, {'marked': 2})
+
+        response = self.client.get(reverse('notification_unread_count'))
+        self.assertEqual(response.data, {'unread_count': 1})
+
+    def test_mark_read_follows_list_order_not_ids(self):
+        older, seen, merged = self.notifications
+        # A merge moved the oldest row to the top of the list after the client looked
+        Notification.objects.filter(pk=older.pk).update(timestamp=timezone.now() + timedelta(minutes=1))
+        Notification.objects.filter(pk=merged.pk).update(timestamp=seen.timestamp - timedelta(minutes=1))
+
+        self.assertEqual(self.mark_read(seen).data, {'marked': 2})
+        self.assertEqual(
+            set(Notification.objects.filter(is_read=False).values_list('pk', flat=True)), {older.pk}
+        )
+
+    def test_mark_read_requires_high_water_mark(self):
+        response = self.client.post(reverse('notification_mark_read'), {})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(reverse('notification_mark_read'), {'up_to': self.notifications[0].pk})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class NotificationQueryCountTestCase(APITestCase):
+    def test_page_costs_constant_queries(self):
+        owner = User.objects.create_user(username='owner', password='testpass123')
+        fan = User.objects.create_user(username='fan', password='testpass123')
+        posts = Post.objects.bulk_create(
+            Post(author=owner, title=f'Post {i}', content='x') for i in range(25)
+        )
+        post_type = ContentType.objects.get_for_model(Post)
+        user_type = ContentType.objects.get_for_model(User)
+        Notification.objects.bulk_create(
+            [Notification(recipient=owner, actor=fan, verb=Verb.LIKED,
+                          target_content_type=post_type, target_object_id=post.pk) for post in posts]
+            + [Notification(recipient=owner, actor=fan, verb=Verb.FOLLOWED,
+                            target_content_type=user_type, target_object_id=fan.pk) for _ in range(25)]
+        )
+
+        self.client.force_authenticate(owner)
+        # Notifications joined with actors, then one query per target type
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('notification_list') + '?page_size=50')
+
+        self.assertEqual(len(response.data['results']), 50)
+        targets = {(n['target_type'], n['target']['title']) for n in response.data['results']}
+        self.assertIn(('CustomUser', 'fan'), targets)
+        self.assertIn(('Post', 'Post 0'), targets)
+
+
+class VerbCodeMigrationTestCase(TransactionTestCase):
+    """Runs 0003's free-text to Verb code conversion against rows written at 0002."""
+    before = ('notifications', '0002_notification_actor_count')
+    after = ('notifications', '0003_compact_verb_and_typed_target')
+
+    def setUp(self):
+        self.executor = MigrationExecutor(connection)
+        latest = self.executor.loader.graph.leaf_nodes('notifications')
+        self.addCleanup(self.migrate, latest)
+        self.migrate([self.before])
+        Notification = self.executor.loader.project_state(self.before).apps.get_model('notifications', 'Notification')
+        self.alice = User.objects.create(username='alice')
+        self.bob = User.objects.create(username='bob')
+        self.make = lambda verb: Notification.objects.create(recipient_id=self.alice.pk, actor_id=self.bob.pk, verb=verb)
+
+    def migrate(self, targets):
+        self.executor.loader.build_graph()
+        self.executor.migrate(targets)
+
+    def test_known_verbs_get_their_codes(self):
+        ids = {self.make(verb.label).pk: verb for verb in Verb}
+
+        self.migrate([self.after])
+
+        Notification = self.executor.loader.project_state(self.after).apps.get_model('notifications', 'Notification')
+        self.assertEqual(dict(Notification.objects.values_list('pk', 'verb')), ids)
+
+    def test_unknown_verb_aborts(self):
+        liked = self.make(Verb.LIKED.label)
+        unliked = self.make('unliked your post')
+
+        # Not guessed from "lik": the migration stops and leaves the rows alone
+        with self.assertRaisesMessage(RuntimeError, "'unliked your post'"):
+            self.migrate([self.after])
+
+        # Once the row is dealt with, migrating again succeeds
+        unliked.delete()
+        self.migrate([self.after])
+        Notification = self.executor.loader.project_state(self.after).apps.get_model('notifications', 'Notification')
+        self.assertEqual(list(Notification.objects.values_list('pk', 'verb')), [(liked.pk, Verb.LIKED)])
+
+
+class AsyncNotificationViewsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username='owner', password='testpass123')
+        fan = User.objects.create_user(username='fan', password='testpass123')
+        post = Post.objects.create(author=self.owner, title='Hot', content='x')
+        post_type = ContentType.objects.get_for_model(Post)
+        Notification.objects.bulk_create(
+            Notification(recipient=self.owner, actor=fan, verb=Verb.LIKED,
+                         target_content_type=post_type, target_object_id=post.pk)
+            for _ in range(3)
+        )
+        Notification.objects.filter(pk=Notification.objects.order_by('pk').first().pk).update(is_read=True)
+        self.headers = {'Authorization': f'Token {Token.objects.create(user=self.owner).key}'}
+        self.factory = AsyncRequestFactory()
+
+    async def test_async_list(self):
+        request = self.factory.get('/api/notifications/', {'page_size': 2}, headers=self.headers)
+        response = await async_views.notification_list(request)
+        page = json.loads(response.content)
+
+        self.assertEqual(len(page['results']), 2)
+        self.assertIsNotNone(page['next'])
+        target = page['results'][0]['target']
+        self.assertEqual((target['type'], target['title']), ('Post', 'Hot'))
+
+    async def test_async_unread_count(self):
+        request = self.factory.get('/api/notifications/unread-count/', headers=self.headers)
+        response = await async_views.unread_count(request)
+        self.assertEqual(json.loads(response.content), {'unread_count': 2})
+
+        response = await async_views.unread_count(self.factory.get('/api/notifications/unread-count/'))
+        self.assertEqual(response.status_code, 401)
+
+
+@override_settings(NOTIFICATIONS_ASYNC=False, NOTIFICATIONS_STREAM_KEEPALIVE=5)
+class NotificationStreamTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username='owner', password='testpass123')
+        self.fan = User.objects.create_user(username='fan', password='testpass123')
+        self.post = Post.objects.create(author=self.owner, title='Hot', content='x')
+        self.token = Token.objects.create(user=self.owner)
+
+    @asynccontextmanager
+    async def open_stream(self, **headers):
+        request = AsyncRequestFactory().get(
+            reverse('notification_stream'), headers={'Authorization': f'Token {self.token.key}', **headers}
+        )
+        response = await async_views.notification_stream(request)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        try:
+            yield stream
+        finally:
+            await stream.aclose()
+
+    async def next_event(self, stream):
+        chunk = (await asyncio.wait_for(anext(stream), timeout=5)).decode()
+        fields = dict(line.split(': ', 1) for line in chunk.strip().split('\n'))
+        return fields['id'], json.loads(fields['data'])
+
+    def like(self, actor):
+        pipeline.submit(NotificationEvent(
+            self.owner.pk, actor.pk, Verb.LIKED, ContentType.objects.get_for_model(Post).pk, self.post.pk
+        ))
+
+    async def test_pushes_written_notifications(self):
+        async with self.open_stream() as stream:
+            self.assertTrue((await anext(stream)).startswith(b'retry:'))
+
+            await sync_to_async(self.like)(self.fan)
+            event_id, record = await self.next_event(stream)
+        notification = await Notification.objects.aget()
+        self.assertEqual(event_id, async_views.event_id(notification))
+        self.assertEqual(record['id'], notification.pk)
+        self.assertEqual((record['verb'], record['actor']['username']), ('liked your post', 'fan'))
+        self.assertEqual(record['target']['title'], 'Hot')
+
+    async def test_replays_unread_after_last_event_id(self):
+        seen = await Notification.objects.acreate(recipient=self.owner, actor=self.fan, verb=Verb.FOLLOWED)
+        missed = await Notification.objects.acreate(recipient=self.owner, actor=self.fan, verb=Verb.FOLLOWED)
+
+        async with self.open_stream(**{'Last-Event-ID': async_views.event_id(seen)}) as stream:
+            await anext(stream)
+            self.assertEqual((await self.next_event(stream))[1]['id'], missed.pk)
+
+    async def test_replays_notifications_merged_after_last_event_id(self):
+        other = await User.objects.acreate(username='other')
+        await sync_to_async(self.like)(self.fan)
+        merged = await Notification.objects.aget()
+        seen = await Notification.objects.acreate(recipient=self.owner, actor=self.fan, verb=Verb.FOLLOWED)
+        # Merging keeps the older (lower) id but moves the row past the last event
+        await sync_to_async(self.like)(other)
+
+        async with self.open_stream(**{'Last-Event-ID': async_views.event_id(seen)}) as stream:
+            await anext(stream)
+            event_id, record = await self.next_event(stream)
+        self.assertLess(merged.pk, seen.pk)
+        self.assertEqual((record['id'], record['actor_count']), (merged.pk, 2))
+
+    def test_not_served_under_wsgi(self):
+        request = RequestFactory().get(
+            reverse('notification_stream'), headers={'Authorization': f'Token {self.token.key}'}
+        )
+        response = async_to_sync(async_views.notification_stream)(request)
+        self.assertEqual(response.status_code, 501)
+        self.assertFalse(response.streaming)
+
+    async def test_requires_token(self):
+        request = AsyncRequestFactory().get(reverse('notification_stream'))
+        response = await async_views.notification_stream(request)
+        self.assertEqual(response.status_code, 401)
@@ -1,8 +1,20 @@
 
+from django.conf import settings
 from django.urls import path
-from .views import NotificationListView
+from . import async_views
+from .views import MarkReadView, NotificationListView, UnreadCountView
+
+# ASYNC_VIEWS serves the async ORM variants (notifications.async_views) under ASGI
+if settings.ASYNC_VIEWS:
+    list_view, unread_count_view = async_views.notification_list, async_views.unread_count
+else:
+    list_view, unread_count_view = NotificationListView.as_view(), UnreadCountView.as_view()
 
 urlpatterns = [
     # Route for users to view their notifications
-    path('', NotificationListView.as_view(), name='notification_list'), 
-]
\ No newline at end of file
+    path('', list_view, name='notification_list'), 
+    path('mark-read/', MarkReadView.as_view(), name='notification_mark_read'),
+    path('unread-count/', unread_count_view, name='notification_unread_count'),
+    # Server-Sent Events push stream (async; answers 501 unless served under ASGI)
+    path('stream/', async_views.notification_stream, name='notification_stream'),
+]
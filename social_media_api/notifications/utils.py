@@ -1,19 +1,26 @@
 
-from .models import Notification
 from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+
+from .pipeline import NotificationEvent, pipeline
 
 def create_notification(recipient, actor, verb, target):
-    """Creates a notification instance for a given action."""
+    """
+    Queues a notification for a given action (``verb`` is a notifications.models.Verb).
+    Nothing is written inside the request: the event is handed to the notification
+    pipeline once the transaction commits.
+    """
     
     # Prevent notifying a user for an action they performed on themselves (e.g., self-like)
-    if recipient == actor:
+    if recipient.pk == actor.pk:
         return
-        
-    Notification.objects.create(
-        recipient=recipient,
-        actor=actor,
+
+    event = NotificationEvent(
+        recipient_id=recipient.pk,
+        actor_id=actor.pk,
         verb=verb,
-        target_content_type=ContentType.objects.get_for_model(target),
+        # get_for_model is served from ContentType's in-process cache after the first call
+        target_content_type_id=ContentType.objects.get_for_model(target).pk,
         target_object_id=target.pk,
-        target=target
-    )
\ No newline at end of file
+    )
+    transaction.on_commit(lambda: pipeline.submit(event))
@@ -1,18 +1,70 @@
 
-from rest_framework import generics, permissions
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.prefetch import GenericPrefetch
+from django.db.models import Q
+from rest_framework import generics, permissions, status
+from rest_framework.response import Response
+from posts.models import Post
+from posts.pagination import KeysetPagination
+from social_media_api.db_router import ReplicaReadMixin
 from .models import Notification
-from .serializers import NotificationSerializer
+from .serializers import MarkReadSerializer, NotificationSerializer
 
-class NotificationListView(generics.ListAPIView):
+class NotificationListView(ReplicaReadMixin, generics.ListAPIView):
+    """
+    Cursor-paginated notification history, newest first. Listing is read-only:
+    clients acknowledge what they've seen through MarkReadView.
+    """
    
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+    cursor_ordering = ('-timestamp', '-id')
 
     def get_queryset(self):
-        # Retrieve all notifications for the authenticated user, ordered by newest first
-        queryset = Notification.objects.filter(recipient=self.request.user)
-        
-        # Optionally, mark unread notifications as read upon listing
-        queryset.filter(is_read=False).update(is_read=True)
-        
-        return queryset.order_by('-timestamp')
\ No newline at end of file
+        # Retrieve all notifications for the authenticated user, ordered by newest first.
+        # Targets are batch-loaded with one query per target type, fetching only the
+        # columns the compact target summary needs.
+        return (
+            Notification.objects.filter(recipient=self.request.user)
+            .select_related('actor')
+            .prefetch_related(
+                # order_by(): targets are matched by id, so skip Post's default sort
+                GenericPrefetch('target', [
+                    Post.objects.only('id', 'title').order_by(),
+                    get_user_model().objects.only('id', 'username').order_by(),
+                ])
+            )
+        )
+
+
+class MarkReadView(generics.GenericAPIView):
+    """
+    Marks every unread notification up to and including the (``timestamp``, ``up_to``
+    id) high-water mark as read, in the list's (timestamp, id) order.
+    """
+
+    serializer_class = MarkReadSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        timestamp, pk = serializer.validated_data['timestamp'], serializer.validated_data['up_to']
+        seen = Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lte=pk)
+        marked = Notification.objects.filter(
+            seen, recipient=request.user, is_read=False
+        ).update(is_read=True)
+
+        return Response({'marked': marked}, status=status.HTTP_200_OK)
+
+
+class UnreadCountView(generics.GenericAPIView):
+    """Cheap polling endpoint: the number of unread notifications."""
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        unread = Notification.objects.filter(recipient=request.user, is_read=False).count()
+        return Response({'unread_count': unread})
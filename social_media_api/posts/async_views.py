@@ -0,0 +1,57 @@
+# posts/async_views.py
+#
+# Async variants of read-heavy endpoints, for ASGI deployments (see
+# social_media_api/asgi.py). They reuse the DRF views' querysets, serializers and
+# paginators but run the ORM through its async API, so a single worker's event loop
+# can hold many slow feed requests open without a thread each. Only keyset (cursor)
+# pagination is offered: page numbers would need a COUNT(*) per request.
+
+import functools
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import APIException
+from rest_framework.utils.encoders import JSONEncoder
+
+from accounts.authentication import async_token_required
+from .serializers import PostSerializer
+from .views import FeedView
+
+
+def api_response(data, status=200):
+    """JSON response encoded the way DRF's JSONRenderer encodes it."""
+    return JsonResponse(data, status=status, encoder=JSONEncoder, safe=False)
+
+
+def handle_api_exceptions(view_func):
+    """Turns DRF exceptions raised by an async view (e.g. a bad cursor) into JSON errors."""
+
+    @functools.wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            return await view_func(request, *args, **kwargs)
+        except APIException as exc:
+            return api_response({'detail': exc.detail}, status=exc.status_code)
+
+    return wrapper
+
+
+@require_GET
+@async_token_required
+@handle_api_exceptions
+async def feed(request):
+    """Async FeedView: the same feed, cursor-paginated."""
+    view = FeedView(request=request, args=(), kwargs={}, format_kwarg=None)
+    queryset = view.get_queryset()
+
+    if view.uses_rings():
+        # Ring merging goes through the (sync) cache API and hydrates by primary key
+        paginator = view.get_pagination_class()()
+        page = await sync_to_async(paginator.paginate_queryset)(queryset, request, view)
+    else:
+        paginator = view.cursor_pagination_class()
+        page = await paginator.apaginate_queryset(queryset, request, view)
+
+    serializer = PostSerializer(page, many=True, context=view.get_serializer_context())
+    return api_response(paginator.get_paginated_response(serializer.data).data)
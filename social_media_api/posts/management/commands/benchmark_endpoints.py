@@ -0,0 +1,149 @@
+# posts/management/commands/benchmark_endpoints.py
+#
+# Endpoint latency benchmark. Drives the hot endpoints in-process through Django's test
+# client (the whole middleware, auth and serialization stack, no network) on behalf of
+# a sample of users, and prints per-scenario p50/p95/p99 latency and query counts as
+# JSON so runs before and after a change can be diffed. Meant for a seeded database
+# (see the seed_social_graph command). The like scenario unlikes the posts it liked,
+# but the notifications those likes produced stay.
+
+import json
+import math
+import random
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.authentication import issue_token
+from posts.management.commands.seed_social_graph import WORDS
+from posts.models import Post
+from social_media_api.metrics import MetricsMiddleware, QueryStats
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def summarize(values, digits=2):
+    return {
+        'p50': round(percentile(values, 50), digits),
+        'p95': round(percentile(values, 95), digits),
+        'p99': round(percentile(values, 99), digits),
+        'mean': round(sum(values) / len(values), digits),
+        'max': round(max(values), digits),
+    }
+
+
+class Command(BaseCommand):
+    help = "Benchmarks the feed, post list/search, like and notification endpoints; prints JSON."
+
+    # name -> method building (http method, url) for one request
+    scenarios = {
+        'feed': 'feed_request',
+        'post_list': 'post_list_request',
+        'post_search': 'post_search_request',
+        'like': 'like_request',
+        'notifications': 'notifications_request',
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help="Measured requests per scenario.")
+        parser.add_argument('--warmup', type=int, default=10, help="Unmeasured requests per scenario first.")
+        parser.add_argument('--users', type=int, default=20, help="How many users to sample as callers.")
+        parser.add_argument('--scenario', action='append', choices=list(self.scenarios), dest='selected',
+                            help="Run only this scenario (repeatable).")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help="Also write the JSON report to this file.")
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError("Pass --requests 1 or more.")
+        self.rng = random.Random(options['seed'])
+
+        # Most-followed-first sample: the callers whose feeds are actually populated
+        users = list(
+            get_user_model().objects.filter(is_active=True)
+            .order_by('-following_count', 'pk')[:options['users']]
+        )
+        self.post_ids = list(Post.objects.values_list('pk', flat=True))
+        if not users or not self.post_ids:
+            raise CommandError("Nothing to benchmark; seed data first (see seed_social_graph).")
+        clients = [
+            Client(headers={'Authorization': f'Token {issue_token(user).key}'}) for user in users
+        ]
+
+        report = {
+            'started_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'settings': {
+                name: getattr(settings, name, None)
+                for name in ('FEED_ENGINE', 'POSTS_PAGINATION_STYLE', 'ASYNC_VIEWS', 'DATABASE_REPLICAS')
+            },
+            'users': len(users),
+            'scenarios': {},
+        }
+        # The test client talks to 'testserver' over plain HTTP
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            for name in options['selected'] or self.scenarios:
+                build = getattr(self, self.scenarios[name])
+                for _ in range(options['warmup']):
+                    self.request(self.rng.choice(clients), build)
+                samples = [self.request(self.rng.choice(clients), build) for _ in range(options['requests'])]
+                report['scenarios'][name] = self.summarize(samples)
+                self.stderr.write(f"{name}: p50 {report['scenarios'][name]['latency_ms']['p50']} ms")
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        self.stdout.write(output)
+
+    def request(self, client, build):
+        """Times one request; returns (milliseconds, query count, status code)."""
+        method, url, cleanup = build()
+        # Counted on every connection, replicas included, and before cleanup runs
+        stats = QueryStats()
+        with MetricsMiddleware.wrap_connections(stats):
+            start = time.perf_counter()
+            response = getattr(client, method)(url, secure=True)
+            elapsed = (time.perf_counter() - start) * 1000
+        queries = stats.count
+        # Only undo what this request created (e.g. not a like that already existed)
+        if cleanup and response.status_code == 201:
+            getattr(client, cleanup[0])(cleanup[1], secure=True)
+        return elapsed, queries, response.status_code
+
+    def summarize(self, samples):
+        return {
+            'requests': len(samples),
+            'latency_ms': summarize([elapsed for elapsed, _, _ in samples]),
+            'queries': summarize([queries for _, queries, _ in samples], digits=1),
+            'status': {str(code): count for code, count in sorted(Counter(code for _, _, code in samples).items())},
+        }
+
+    # --- Scenarios: each returns (method, url, cleanup request or None) ---
+
+    def feed_request(self):
+        return 'get', reverse('feed'), None
+
+    def post_list_request(self):
+        return 'get', reverse('post-list'), None
+
+    def post_search_request(self):
+        return 'get', f"{reverse('post-list')}?q={self.rng.choice(WORDS)}", None
+
+    def like_request(self):
+        post_id = self.rng.choice(self.post_ids)
+        return 'post', reverse('post-like', args=[post_id]), ('post', reverse('post-unlike', args=[post_id]))
+
+    def notifications_request(self):
+        return 'get', reverse('notification_list'), None
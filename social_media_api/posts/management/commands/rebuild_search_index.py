@@ -0,0 +1,25 @@
+# posts/management/commands/rebuild_search_index.py
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from posts.models import Post
+from posts.search import SEARCH_BATCH_SIZE, create_index, is_supported, rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the FTS5 full-text search index over all posts in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=SEARCH_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        if not is_supported():
+            raise CommandError("Full-text search needs an SQLite database with FTS5.")
+
+        create_index()
+        # Searches keep seeing the old index until the rebuild commits
+        with transaction.atomic():
+            total = rebuild_index(Post.objects.all(), batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} posts."))
@@ -0,0 +1,33 @@
+# posts/management/commands/rebuild_timelines.py
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.timeline import rebuild_timeline
+
+
+class Command(BaseCommand):
+    help = "Rebuilds materialized home timelines from the follow graph."
+
+    def add_arguments(self, parser):
+        parser.add_argument('usernames', nargs='*', help="Users whose timeline should be rebuilt.")
+        parser.add_argument('--all', action='store_true', help="Rebuild the timeline of every user.")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+
+        if options['all']:
+            users = User.objects.all()
+        elif options['usernames']:
+            users = User.objects.filter(username__in=options['usernames'])
+            missing = set(options['usernames']) - set(users.values_list('username', flat=True))
+            if missing:
+                raise CommandError(f"Unknown users: {', '.join(sorted(missing))}")
+        else:
+            raise CommandError("Pass one or more usernames, or --all.")
+
+        for user in users.iterator():
+            count = rebuild_timeline(user)
+            self.stdout.write(f"{user.username}: {count} timeline entries")
+
+        self.stdout.write(self.style.SUCCESS("Timelines rebuilt."))
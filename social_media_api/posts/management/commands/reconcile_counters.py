@@ -0,0 +1,75 @@
+# posts/management/commands/reconcile_counters.py
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from posts.models import Comment, Like, Post
+
+
+def _total(queryset, field):
+    """The number of ``queryset`` rows whose ``field`` points at the outer row, as an expression."""
+    counted = (
+        queryset.filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counted, output_field=IntegerField()), Value(0))
+
+
+class Command(BaseCommand):
+    help = "Recomputes denormalized like/comment/follow counters in batches and fixes drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        User = get_user_model()
+        Follow = User.followers.through
+
+        fixed_posts = self.reconcile(
+            Post, batch_size,
+            like_count=lambda: _total(Like.objects, 'post'),
+            comment_count=lambda: _total(Comment.objects, 'post'),
+        )
+        fixed_users = self.reconcile(
+            User, batch_size,
+            followers_count=lambda: _total(Follow.objects, 'from_customuser'),
+            following_count=lambda: _total(Follow.objects, 'to_customuser'),
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Counters reconciled: {fixed_posts} posts and {fixed_users} users corrected."
+        ))
+
+    def reconcile(self, model, batch_size, **counters):
+        """
+        Walks ``model`` in primary-key batches, rewriting rows whose stored counters drifted.
+
+        Each batch is a single UPDATE that sets the counters from correlated COUNT(*)
+        subqueries, so the counts are read and written in one statement and a
+        concurrent F() increment can't be overwritten by a value counted earlier.
+        """
+        fixed = 0
+        last_pk = 0
+
+        while True:
+            bounds = list(
+                model.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size]
+            )
+            if not bounds:
+                return fixed
+            first_pk, last_pk = bounds[0], bounds[-1]
+
+            drifted = Q()
+            for field, total in counters.items():
+                drifted |= ~Q(**{field: total()})
+            fixed += (
+                model.objects.filter(pk__gte=first_pk, pk__lte=last_pk)
+                .filter(drifted)
+                .update(**{field: total() for field, total in counters.items()})
+            )
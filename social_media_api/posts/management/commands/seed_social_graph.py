@@ -0,0 +1,268 @@
+# posts/management/commands/seed_social_graph.py
+#
+# Seeds a synthetic but production-shaped dataset for local performance work: a
+# power-law follow graph (a few users with huge audiences, most with a handful of
+# followers), posts written mostly by a small active minority, likes and comments
+# skewed towards popular authors, and the notifications those events produce.
+# Everything is written with bulk_create, with denormalized counters precomputed and
+# timelines and the search index rebuilt at the end.
+
+import random
+from collections import Counter
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from notifications.models import Notification, NotificationActor, Verb
+from posts.models import Comment, Like, Post
+from posts.search import create_index, is_supported, rebuild_index
+from posts.timeline import rebuild_timeline
+
+WORDS = (
+    'django python query index cache feed timeline latency replica follow like comment '
+    'coffee weekend hiking music travel photo release deploy bug review design sqlite'
+).split()
+
+
+def zipf_weights(count, exponent, rng):
+    """Zipf weights (rank r gets 1 / r**exponent), shuffled so rank isn't tied to pk."""
+    weights = [1 / rank ** exponent for rank in range(1, count + 1)]
+    rng.shuffle(weights)
+    return weights
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Lets bulk_create write the given (backdated) values into auto_now/auto_now_add fields."""
+    fields = [
+        (field, field.auto_now, field.auto_now_add)
+        for model in models
+        for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    for field, _, _ in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in fields:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def sentence(rng, words):
+    return ' '.join(rng.choices(WORDS, k=words)).capitalize() + '.'
+
+
+class Command(BaseCommand):
+    help = "Seeds a power-law social graph of users, follows, posts, comments, likes and notifications."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--posts', type=int, default=20000)
+        parser.add_argument('--comments', type=int, default=40000)
+        parser.add_argument('--likes', type=int, default=100000)
+        parser.add_argument('--notifications', type=int, default=20000)
+        parser.add_argument('--avg-follows', type=int, default=30, help="Mean number of users each user follows.")
+        parser.add_argument('--exponent', type=float, default=1.1, help="Zipf exponent of popularity and activity.")
+        parser.add_argument('--days', type=int, default=30, help="Spread content over this many past days.")
+        parser.add_argument('--prefix', default='seed', help="Username prefix of the generated users.")
+        parser.add_argument('--password', default='seedpass123')
+        parser.add_argument('--seed', type=int, default=0, help="Random seed, for reproducible datasets.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if options['users'] < 2:
+            raise CommandError("Pass --users 2 or more.")
+        User = get_user_model()
+        if User.objects.filter(username__startswith=options['prefix']).exists():
+            raise CommandError(
+                f"Users named '{options['prefix']}...' already exist; pass another --prefix."
+            )
+
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        self.span = timedelta(days=options['days'])
+
+        count = options['users']
+        # Who gets followed and liked, and who writes (cumulative, for choices())
+        self.popularity = zipf_weights(count, options['exponent'], self.rng)
+        self.popularity_cum = list(accumulate(self.popularity))
+        self.activity_cum = list(accumulate(zipf_weights(count, options['exponent'], self.rng)))
+
+        with transaction.atomic(), explicit_timestamps(Post, Comment, Like, Notification):
+            follows = self.follow_graph(count, options['avg_follows'])
+            users = self.create_users(count, follows, options['prefix'], options['password'])
+            self.create_follows(users, follows)
+            posts, authors = self.build_posts(users, options['posts'])
+            # Engagement is drawn first so the posts are written with their counters
+            likes = sorted(set(self.engagement(users, authors, options['likes'])))
+            comments = self.engagement(users, authors, options['comments'])
+            for post, _ in likes:
+                posts[post].like_count += 1
+            for post, _ in comments:
+                posts[post].comment_count += 1
+            posts = Post.objects.bulk_create(posts, batch_size=self.batch_size)
+            self.create_likes(users, posts, likes)
+            self.create_comments(users, posts, comments)
+            notifications = self.create_notifications(
+                users, posts, authors, follows, likes, comments, options['notifications']
+            )
+
+            for user in users:
+                rebuild_timeline(user)
+            if is_supported():
+                create_index()
+                rebuild_index(Post.objects.all(), batch_size=self.batch_size)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(users)} users, {len(follows)} follows, {len(posts)} posts, "
+            f"{len(comments)} comments, {len(likes)} likes and {notifications} notifications."
+        ))
+
+    def timestamp(self, after=None):
+        """A random moment in the seeded period, no earlier than ``after``."""
+        start = after or self.now - self.span
+        return start + (self.now - start) * self.rng.random()
+
+    def follow_graph(self, count, avg_follows):
+        """(follower, followee) index pairs: Pareto out-degrees, Zipf-weighted followees."""
+        pairs = set()
+        for follower in range(count):
+            # paretovariate(1.5) has mean 3, so the degrees average to avg_follows
+            degree = min(count - 1, int(self.rng.paretovariate(1.5) * avg_follows / 3))
+            followed = set()
+            # Popular users are drawn over and over; give up on the tail after a few rounds
+            for _ in range(4):
+                if len(followed) >= degree:
+                    break
+                candidates = self.rng.choices(range(count), cum_weights=self.popularity_cum, k=degree * 2)
+                followed.update(candidate for candidate in candidates if candidate != follower)
+            pairs.update((follower, followee) for followee in list(followed)[:degree])
+        return sorted(pairs)
+
+    def create_users(self, count, follows, prefix, password):
+        followers = Counter(followee for _, followee in follows)
+        following = Counter(follower for follower, _ in follows)
+        # Hashing once keeps seeding fast; every user shares the password
+        hashed = make_password(password)
+        users = [
+            get_user_model()(
+                username=f'{prefix}{i:06d}',
+                email=f'{prefix}{i:06d}@example.com',
+                password=hashed,
+                bio=sentence(self.rng, 8),
+                followers_count=followers[i],
+                following_count=following[i],
+            )
+            for i in range(count)
+        ]
+        return get_user_model().objects.bulk_create(users, batch_size=self.batch_size)
+
+    def create_follows(self, users, follows):
+        Follow = get_user_model().followers.through
+        Follow.objects.bulk_create(
+            (
+                Follow(from_customuser_id=users[followee].pk, to_customuser_id=users[follower].pk)
+                for follower, followee in follows
+            ),
+            batch_size=self.batch_size,
+        )
+
+    def build_posts(self, users, count):
+        """Unsaved posts, with the index of each one's author."""
+        authors = self.rng.choices(range(len(users)), cum_weights=self.activity_cum, k=count)
+        # Oldest first, so ids grow with time as they would in production
+        times = sorted(self.timestamp() for _ in range(count))
+        posts = [
+            Post(
+                author_id=users[author].pk,
+                title=sentence(self.rng, 4),
+                content=sentence(self.rng, 30),
+                created_at=created_at,
+                updated_at=created_at,
+            )
+            for author, created_at in zip(authors, times)
+        ]
+        return posts, authors
+
+    def engagement(self, users, authors, count):
+        """(post, user) index pairs: active users on posts of popular authors."""
+        actors = self.rng.choices(range(len(users)), cum_weights=self.activity_cum, k=count)
+        weights = list(accumulate(self.popularity[author] for author in authors))
+        return list(zip(self.rng.choices(range(len(authors)), cum_weights=weights, k=count), actors))
+
+    def create_likes(self, users, posts, likes):
+        Like.objects.bulk_create(
+            (
+                Like(
+                    post_id=posts[post].pk,
+                    user_id=users[actor].pk,
+                    created_at=self.timestamp(after=posts[post].created_at),
+                )
+                for post, actor in likes
+            ),
+            batch_size=self.batch_size,
+        )
+
+    def create_comments(self, users, posts, comments):
+        created = [self.timestamp(after=posts[post].created_at) for post, _ in comments]
+        Comment.objects.bulk_create(
+            (
+                Comment(
+                    post_id=posts[post].pk,
+                    author_id=users[actor].pk,
+                    content=sentence(self.rng, 12),
+                    created_at=created_at,
+                    updated_at=created_at,
+                )
+                for (post, actor), created_at in zip(comments, created)
+            ),
+            batch_size=self.batch_size,
+        )
+
+    def create_notifications(self, users, posts, authors, follows, likes, comments, count):
+        """A random sample of the follow/like/comment events, as un-coalesced notifications."""
+        user_type = ContentType.objects.get_for_model(get_user_model())
+        post_type = ContentType.objects.get_for_model(Post)
+        # (recipient, actor, verb, target type, target id, earliest time)
+        events = [
+            (followee, follower, Verb.FOLLOWED, user_type, users[follower].pk, None)
+            for follower, followee in follows
+        ]
+        for verb, pairs in ((Verb.LIKED, likes), (Verb.COMMENTED, comments)):
+            events.extend(
+                (authors[post], actor, verb, post_type, posts[post].pk, posts[post].created_at)
+                for post, actor in pairs
+                if authors[post] != actor
+            )
+
+        events = self.rng.sample(events, min(count, len(events)))
+        notifications = Notification.objects.bulk_create(
+            (
+                Notification(
+                    recipient_id=users[recipient].pk,
+                    actor_id=users[actor].pk,
+                    verb=verb,
+                    target_content_type=target_type,
+                    target_object_id=target_id,
+                    # Most of an inbox has been seen already
+                    is_read=self.rng.random() < 0.7,
+                    timestamp=self.timestamp(after=earliest),
+                )
+                for recipient, actor, verb, target_type, target_id, earliest in events
+            ),
+            batch_size=self.batch_size,
+        )
+        NotificationActor.objects.bulk_create(
+            (NotificationActor(notification=n, actor_id=n.actor_id) for n in notifications),
+            batch_size=self.batch_size,
+        )
+        return len(events)
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:00
+#
+# Creates the FTS5 full-text index used by posts.search (SQLite only) and fills it
+# from the existing posts.
+
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    from posts import search
+
+    if not search.is_supported(schema_editor.connection):
+        return
+    search.create_index(schema_editor.connection)
+    search.rebuild_index(apps.get_model('posts', 'Post').objects.all())
+
+
+def drop_search_index(apps, schema_editor):
+    from posts import search
+
+    if search.is_supported(schema_editor.connection):
+        search.drop_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0005_engagement_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
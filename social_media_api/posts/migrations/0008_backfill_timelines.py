@@ -0,0 +1,47 @@
+# Fills TimelineEntry for data that predates it. The feed reads only the timeline
+# table, and fan-out/backfill only run on new posts and follows, so without this every
+# existing user would see an empty feed. Same rows as the rebuild_timelines command,
+# but additive (entries already fanned out are kept) and using the historical models.
+
+from django.conf import settings
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def backfill_timelines(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Post = apps.get_model('posts', 'Post')
+    TimelineEntry = apps.get_model('posts', 'TimelineEntry')
+    Follow = User.followers.through
+    limit = getattr(settings, 'TIMELINE_REBUILD_LIMIT', 1000)
+
+    # Only users following someone have anything to show
+    owner_ids = Follow.objects.order_by('to_customuser_id').values_list('to_customuser_id', flat=True).distinct()
+    for owner_id in owner_ids.iterator():
+        authors = Follow.objects.filter(to_customuser_id=owner_id).values('from_customuser_id')
+        recent = (
+            Post.objects.filter(author_id__in=authors)
+            .order_by('-created_at', '-id')
+            .values_list('id', 'created_at')[:limit]
+        )
+        TimelineEntry.objects.bulk_create(
+            (
+                TimelineEntry(owner_id=owner_id, post_id=post_id, created_at=created_at)
+                for post_id, created_at in recent
+            ),
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0007_hot_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_timelines, migrations.RunPython.noop),
+    ]
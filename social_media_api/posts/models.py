@@ -15,8 +15,19 @@ class Post(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Denormalized counters, kept current with F() updates in the like/comment views.
+    # Drift (e.g. from cascading deletes) is fixed by the reconcile_counters command.
+    like_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Newest-first post list, and its (created_at, id) cursor pages
+            models.Index(fields=['-created_at', '-id'], name='post_created_idx'),
+            # One author's newest posts (rings, timeline backfill, profile listings)
+            models.Index(fields=['author', '-created_at', '-id'], name='post_author_created_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -39,6 +50,13 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            # A post's comments, newest first for the latest-N prefetch and read
+            # backwards for chronological listings
+            models.Index(fields=['post', '-created_at', '-id'], name='comment_post_created_idx'),
+            # The site-wide comment list, paged by (created_at, id)
+            models.Index(fields=['created_at', 'id'], name='comment_created_idx'),
+        ]
 
     def __str__(self):
         return f'Comment by {self.author.username} on Post ID {self.post.id}'
@@ -57,8 +75,39 @@ class Like(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
-        # Ensures a user can only like a post once
-        unique_together = ('post', 'user') 
+        # Ensures a user can only like a post once. Its (post, user) index also
+        # serves the liked-by-me EXISTS checks and the batch like-status lookup.
+        unique_together = ('post', 'user')
+
+    def __str__(self):
+        return f'{self.user.username} likes {self.post.title}'
+
+class TimelineEntry(models.Model):
+    """Materialized home-timeline row: ``post`` appears in ``owner``'s feed."""
+
+    owner = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries'
+    )
+    # Deleting a post cascades to (and so prunes) every timeline it was fanned out to
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries'
+    )
+    # Copied from post.created_at so a feed page is a single range scan on the index below
+    created_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-created_at']
+        unique_together = ('owner', 'post')
+        indexes = [
+            models.Index(
+                fields=['owner', '-created_at', '-post'],
+                name='timeline_owner_created_idx'
+            ),
+        ]
 
     def __str__(self):
-        return f'{self.user.username} likes {self.post.title}'
\ No newline at end of file
+        return f'Post ID {self.post_id} in timeline of user ID {self.owner_id}'
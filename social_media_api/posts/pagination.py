@@ -1,8 +1,221 @@
 # posts/pagination.py
 
-from rest_framework.pagination import PageNumberPagination
+import base64
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .rings import merge_rings
 
 class StandardResultsPagination(PageNumberPagination):
     page_size = 10
     page_size_query_param = 'page_size'
-    max_page_size = 100
\ No newline at end of file
+    max_page_size = 100
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination keyed on a unique tuple of columns (``(created_at, id)`` by default).
+    Pages are fetched with a ``WHERE (created_at, id) < cursor`` range condition, so page N
+    costs the same as page 1, no COUNT(*) is issued and pages don't shift as rows arrive.
+    Views may set ``cursor_ordering`` to key on other (possibly annotated) fields.
+    """
+
+    page_size = StandardResultsPagination.page_size
+    page_size_query_param = StandardResultsPagination.page_size_query_param
+    max_page_size = StandardResultsPagination.max_page_size
+    cursor_query_param = 'cursor'
+    ordering = ('-created_at', '-id')
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset, cursor = self._page_queryset(queryset, request, view)
+        return self._set_page(list(queryset), cursor)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Async ORM variant of paginate_queryset for async views."""
+        queryset, cursor = self._page_queryset(queryset, request, view)
+        # An explicit chunk size lets aiterator() honour prefetch_related()
+        results = [obj async for obj in queryset.aiterator(chunk_size=self.page_size + 1)]
+        return self._set_page(results, cursor)
+
+    def _page_queryset(self, queryset, request, view):
+        """Returns the (unevaluated) queryset for the requested page, plus the decoded cursor."""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = tuple(getattr(view, 'cursor_ordering', self.ordering))
+
+        cursor = self.decode_cursor(request)
+        self.reverse = cursor is not None and cursor['reverse']
+        ordering = self._flip(self.ordering) if self.reverse else self.ordering
+
+        if cursor is not None:
+            # A well-formed token can still carry values the key fields reject
+            try:
+                queryset = queryset.filter(self._after(ordering, cursor['key']))
+            except (ValidationError, ValueError, TypeError):
+                raise NotFound(self.invalid_cursor_message)
+        return queryset.order_by(*ordering)[:self.page_size + 1], cursor
+
+    def _set_page(self, results, cursor):
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if self.reverse:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(page_size, self.max_page_size) if page_size > 0 else self.page_size
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if not self.page:
+            # Walked backwards off the start: the next page is the first page
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self._link(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self._link(self.page[0], reverse=True)
+
+    # --- Cursor encoding ---
+
+    def encode_cursor(self, key, reverse=False):
+        payload = {'r': int(reverse), 'k': [self._dump(value) for value in key]}
+        return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token.encode()))
+            key = payload['k']
+            if len(key) != len(self.ordering):
+                raise ValueError
+            return {'reverse': bool(payload['r']), 'key': key}
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_key(self, instance):
+        return tuple(getattr(instance, field.lstrip('-')) for field in self.ordering)
+
+    def _link(self, instance, reverse):
+        token = self.encode_cursor(self.get_key(instance), reverse=reverse)
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, token)
+
+    @staticmethod
+    def _dump(value):
+        return value.isoformat() if isinstance(value, datetime) else value
+
+    @staticmethod
+    def _flip(ordering):
+        return tuple(field[1:] if field.startswith('-') else f'-{field}' for field in ordering)
+
+    @staticmethod
+    def _after(ordering, key):
+        """Builds ``(f1, f2, ...) > key`` in ordering direction as an OR of prefix matches."""
+        condition = Q()
+        for i, field in enumerate(ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            equal = {f.lstrip('-'): value for f, value in zip(ordering[:i], key)}
+            condition |= Q(**equal, **{f'{name}__{lookup}': key[i]})
+        return condition
+
+
+class RingFeedPagination(KeysetPagination):
+    """
+    Keyset pagination for the pull-model feed (see posts.rings). Instead of filtering the
+    queryset, each page is the next ``page_size`` keys of a k-way merge over the rings of
+    ``view.get_ring_author_ids()``; the queryset only hydrates those posts by primary key.
+    Rings are newest-first, so only forward (``next``) links are produced.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        cursor = self.decode_cursor(request)
+        before = None
+        if cursor is not None:
+            try:
+                before = tuple(int(value) for value in cursor['key'])
+            except (TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+
+        keys = merge_rings(view.get_ring_author_ids(), before, self.page_size + 1)
+        self.has_next, self.has_previous = len(keys) > self.page_size, False
+        keys = keys[:self.page_size]
+        self.last_key = keys[-1] if keys else None
+
+        posts = queryset.in_bulk([post_id for _, post_id in keys])
+        # Posts deleted since their key was cached are simply skipped
+        self.page = [posts[post_id] for _, post_id in keys if post_id in posts]
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        token = self.encode_cursor(self.last_key)
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, token)
+
+
+class SwitchablePaginationMixin:
+    """
+    Lets a list view serve either page-number or keyset pagination. Clients opt in with
+    ``?pagination=cursor`` (or by following a ``cursor`` link); the project-wide default
+    comes from the ``POSTS_PAGINATION_STYLE`` setting.
+    """
+
+    cursor_pagination_class = KeysetPagination
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            pagination_class = self.get_pagination_class()
+            self._paginator = pagination_class() if pagination_class else None
+        return self._paginator
+
+    def get_pagination_class(self):
+        params = self.request.query_params
+        style = params.get('pagination', getattr(settings, 'POSTS_PAGINATION_STYLE', 'page'))
+        if style == 'cursor' or KeysetPagination.cursor_query_param in params:
+            return self.cursor_pagination_class
+        return self.pagination_class
@@ -0,0 +1,102 @@
+# posts/rings.py
+#
+# Pull-model feed engine: each author has a bounded, newest-first "ring" of their recent
+# post keys in Django's cache, and a feed page is a heapq k-way merge over the rings of
+# the authors the reader follows. Selected with FEED_ENGINE = 'ring'.
+
+import heapq
+from datetime import datetime, timedelta, timezone
+from itertools import dropwhile, islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from .models import Post
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def ring_key(author_id):
+    return f'posts:ring:{author_id}'
+
+
+def ring_size():
+    return getattr(settings, 'FEED_RING_SIZE', 200)
+
+
+def ring_timeout():
+    return getattr(settings, 'FEED_RING_TIMEOUT', 300)
+
+
+def post_key(created_at, post_id):
+    """Sortable ring entry: (microseconds since the epoch, post id)."""
+    return ((created_at - EPOCH) // timedelta(microseconds=1), post_id)
+
+
+def push_to_ring(post):
+    """Adds a new post to its author's ring. A cold ring is left to be loaded on the next read."""
+    key = ring_key(post.author_id)
+    ring = cache.get(key)
+    if ring is None:
+        return
+    ring.insert(0, post_key(post.created_at, post.pk))
+    cache.set(key, ring[:ring_size()], ring_timeout())
+
+
+def remove_from_ring(post):
+    key = ring_key(post.author_id)
+    ring = cache.get(key)
+    if ring is None:
+        return
+    cache.set(key, [entry for entry in ring if entry[1] != post.pk], ring_timeout())
+
+
+def get_rings(author_ids):
+    """Returns the ring of every author, loading cold rings from the database in one query."""
+    keys = {ring_key(author_id): author_id for author_id in author_ids}
+    cached = cache.get_many(keys)
+    rings = {keys[key]: ring for key, ring in cached.items()}
+
+    missing = [author_id for author_id in author_ids if author_id not in rings]
+    if missing:
+        loaded = {author_id: [] for author_id in missing}
+        recent = (
+            Post.objects.filter(author_id__in=missing)
+            .annotate(
+                rank=Window(
+                    RowNumber(),
+                    partition_by=F('author_id'),
+                    order_by=[F('created_at').desc(), F('id').desc()],
+                )
+            )
+            .filter(rank__lte=ring_size())
+            .order_by('author_id', '-created_at', '-id')
+            .values_list('author_id', 'created_at', 'id')
+        )
+        for author_id, created_at, post_id in recent:
+            loaded[author_id].append(post_key(created_at, post_id))
+        cache.set_many({ring_key(author_id): ring for author_id, ring in loaded.items()}, ring_timeout())
+        rings.update(loaded)
+
+    return rings
+
+
+def followed_author_ids(user):
+    Follow = get_user_model().followers.through
+    return list(
+        Follow.objects.filter(to_customuser_id=user.pk).values_list('from_customuser_id', flat=True)
+    )
+
+
+def merge_rings(author_ids, before=None, limit=None):
+    """
+    K-way merges the authors' rings into one newest-first stream of post keys, starting
+    strictly after the ``before`` key and yielding at most ``limit`` entries.
+    """
+    rings = get_rings(author_ids).values()
+    if before is not None:
+        rings = [dropwhile(lambda entry: entry >= before, ring) for ring in rings]
+    return list(islice(heapq.merge(*rings, reverse=True), limit))
@@ -0,0 +1,140 @@
+# posts/search.py
+#
+# Full-text search over posts backed by an SQLite FTS5 virtual table whose rowid is the
+# post id. The index is kept current by the post_save/post_delete handlers in
+# posts.signals and can be rebuilt with the rebuild_search_index command. On databases
+# without FTS5 the ?q= search falls back to case-insensitive substring matching.
+
+from django.db import connection, connections
+from django.db.models import Q
+from django.utils.html import escape
+
+SEARCH_TABLE = 'posts_post_fts'
+
+# Column weights for bm25(): title, content, author
+RANK_WEIGHTS = (10.0, 1.0, 2.0)
+# snippet() marks matches with these private-use characters, which survive HTML
+# escaping of the post text and are then swapped for <mark> tags (see highlight)
+SNIPPET_MARKERS = ('\ue000', '\ue001')
+HIGHLIGHT_TAGS = ('<mark>', '</mark>')
+SNIPPET_ELLIPSIS = '…'
+SNIPPET_TOKENS = 12
+
+# Rows written per INSERT when rebuilding
+SEARCH_BATCH_SIZE = 1000
+
+
+def is_supported(conn=None):
+    return (conn or connection).vendor == 'sqlite'
+
+
+def create_index(conn=None):
+    with (conn or connection).cursor() as cursor:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+            "title, content, author, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+
+
+def drop_index(conn=None):
+    with (conn or connection).cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+
+def _write_rows(cursor, rows):
+    """Replaces the index rows for ``rows`` of (post_id, title, content, author_username)."""
+    rows = list(rows)
+    cursor.executemany(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [(row[0],) for row in rows])
+    cursor.executemany(
+        f"INSERT INTO {SEARCH_TABLE} (rowid, title, content, author) VALUES (%s, %s, %s, %s)", rows
+    )
+
+
+def index_post(post):
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        _write_rows(cursor, [(post.pk, post.title, post.content, post.author.username)])
+
+
+def unindex_post(post_id):
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [post_id])
+
+
+def rebuild_index(posts, batch_size=SEARCH_BATCH_SIZE):
+    """Re-indexes every post of the ``posts`` queryset in primary-key batches. Returns the row count."""
+    with connections[posts.db].cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+        total = 0
+        last_pk = 0
+        while True:
+            batch = list(
+                posts.filter(pk__gt=last_pk).order_by('pk')
+                .values_list('pk', 'title', 'content', 'author__username')[:batch_size]
+            )
+            if not batch:
+                break
+            cursor.executemany(
+                f"INSERT INTO {SEARCH_TABLE} (rowid, title, content, author) VALUES (%s, %s, %s, %s)",
+                batch,
+            )
+            total += len(batch)
+            last_pk = batch[-1][0]
+        # Merge the b-trees written batch by batch into one
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')")
+    return total
+
+
+def match_expression(query):
+    """
+    Turns free text into an FTS5 query: every term must match, each quoted so user input
+    can't inject FTS5 syntax. A trailing ``*`` on a term keeps prefix matching.
+    """
+    terms = []
+    for term in query.split():
+        prefix = term.endswith('*')
+        term = term.rstrip('*').replace('"', '""')
+        if term:
+            terms.append(f'"{term}"' + ('*' if prefix else ''))
+    return ' '.join(terms)
+
+
+def highlight(snippet):
+    """HTML for a raw ``search_snippet``: the post text escaped, matches in <mark> tags."""
+    html = escape(snippet)
+    for marker, tag in zip(SNIPPET_MARKERS, HIGHLIGHT_TAGS):
+        html = html.replace(marker, tag)
+    return html
+
+
+def search_posts(queryset, query):
+    """
+    Restricts ``queryset`` to posts matching ``query``, best match first. Each post is
+    annotated with ``search_rank`` (bm25, lower is better) and a highlighted ``search_snippet``.
+    """
+    expression = match_expression(query)
+    if not expression:
+        return queryset.none()
+
+    if not is_supported():
+        condition = Q()
+        for term in query.split():
+            condition &= Q(title__icontains=term) | Q(content__icontains=term) | Q(author__username__icontains=term)
+        return queryset.filter(condition)
+
+    weights = ', '.join(str(weight) for weight in RANK_WEIGHTS)
+    start, end = SNIPPET_MARKERS
+    return queryset.extra(
+        select={
+            'search_rank': f"bm25({SEARCH_TABLE}, {weights})",
+            'search_snippet': f"snippet({SEARCH_TABLE}, -1, %s, %s, %s, {SNIPPET_TOKENS})",
+        },
+        select_params=(start, end, SNIPPET_ELLIPSIS),
+        tables=[SEARCH_TABLE],
+        where=[f"{SEARCH_TABLE} MATCH %s", f"{SEARCH_TABLE}.rowid = posts_post.id"],
+        params=[expression],
+        order_by=['search_rank', '-id'],
+    )
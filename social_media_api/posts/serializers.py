@@ -1,9 +1,60 @@
 # posts/serializers.py
 
+from django.contrib.auth import get_user_model
+from django.db.models import Exists, OuterRef, Prefetch
 from rest_framework import serializers
-from .models import Post, Comment
+from .models import Post, Comment, Like
+from .search import highlight
 from accounts.serializers import UserSerializer 
 
+# Upper bound for ?comments=N
+MAX_EMBEDDED_COMMENTS = 100
+# Upper bound for the batch like-status lookup
+MAX_LIKE_STATUS_IDS = 500
+
+
+def _param_set(request, name):
+    value = request.query_params.get(name) if request is not None else None
+    return {field.strip() for field in value.split(',') if field.strip()} if value else set()
+
+
+def selected_fields(request, available):
+    """Applies ?fields= (keep only these) and ?omit= (drop these) to ``available`` field names."""
+    selected = set(available)
+    only = _param_set(request, 'fields')
+    if only:
+        selected &= only
+    return selected - _param_set(request, 'omit')
+
+
+def comment_limit(request):
+    """Parses ?comments=N; None means embed every comment."""
+    value = request.query_params.get('comments') if request is not None else None
+    if value is None:
+        return None
+    try:
+        limit = int(value)
+    except ValueError:
+        raise serializers.ValidationError({'comments': 'Must be a non-negative integer.'})
+    if limit < 0:
+        raise serializers.ValidationError({'comments': 'Must be a non-negative integer.'})
+    return min(limit, MAX_EMBEDDED_COMMENTS)
+
+
+class SparseFieldsetMixin:
+    """Trims the serializer's fields according to the request's ?fields= / ?omit= parameters."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method != 'GET':
+            return
+        keep = selected_fields(request, self.fields)
+        for name in list(self.fields):
+            if name not in keep:
+                self.fields.pop(name)
+
+
 # --- Helper Serializer for Comment (Nested) ---
 class CommentSerializer(serializers.ModelSerializer):
     author = UserSerializer(read_only=True) 
@@ -13,19 +64,105 @@ class CommentSerializer(serializers.ModelSerializer):
         fields = ['id', 'post', 'author', 'content', 'created_at', 'updated_at']
         read_only_fields = ['author', 'post']
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Joins in each comment's author so a list of comments runs no per-row queries."""
+        return queryset.select_related('author')
+
 # --- Post Serializer ---
-class PostSerializer(serializers.ModelSerializer):
+class PostSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     author = UserSerializer(read_only=True) 
     comments = CommentSerializer(many=True, read_only=True) 
-    comment_count = serializers.SerializerMethodField()
+    has_more_comments = serializers.SerializerMethodField()
+    # Viewer state, annotated in bulk by setup_eager_loading (False when unavailable)
+    liked_by_me = serializers.BooleanField(read_only=True, default=False)
+    author_followed_by_me = serializers.BooleanField(read_only=True, default=False)
 
     class Meta:
         model = Post
         fields = [
             'id', 'author', 'title', 'content', 'created_at', 'updated_at',
-            'comment_count', 'comments'
+            'like_count', 'comment_count', 'comments', 'has_more_comments',
+            'liked_by_me', 'author_followed_by_me'
         ]
-        read_only_fields = ['author', 'created_at', 'updated_at']
+        # Counters are denormalized columns maintained by the like/comment views
+        read_only_fields = ['author', 'created_at', 'updated_at', 'like_count', 'comment_count']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.comment_limit = comment_limit(self.context.get('request'))
+        if self.comment_limit is not None and 'comments' in self.fields:
+            # Embed only the latest N comments (prefetched into ``latest_comments``)
+            self.fields['comments'] = serializers.SerializerMethodField(method_name='get_latest_comments')
+
+    @staticmethod
+    def setup_eager_loading(queryset, request=None):
+        """
+        Makes a page of posts cost a fixed number of queries: one for the posts joined
+        with their authors and one for all their comments joined with theirs. Comments
+        are skipped or cut to the latest N when the request asks for a sparse payload.
+        The viewer's like/follow state is computed with EXISTS subqueries in the same
+        query as the posts.
+        """
+        queryset = queryset.select_related('author')
+        queryset = PostSerializer.annotate_viewer_state(queryset, request)
+        if 'comments' not in selected_fields(request, ['comments']):
+            return queryset
+
+        # Ordered by post first so both prefetches walk comment_post_created_idx in
+        # index order (backwards for all comments, forwards for the latest N) instead
+        # of sorting; each post's comments still come out in the right order
+        comments = CommentSerializer.setup_eager_loading(Comment.objects.all())
+        limit = comment_limit(request)
+        if limit is None:
+            comments = comments.order_by('-post_id', 'created_at', 'id')
+            return queryset.prefetch_related(Prefetch('comments', queryset=comments))
+
+        latest = comments.order_by('post_id', '-created_at', '-id')[:limit]
+        return queryset.prefetch_related(Prefetch('comments', queryset=latest, to_attr='latest_comments'))
+
+    @staticmethod
+    def annotate_viewer_state(queryset, request):
+        user = getattr(request, 'user', None)
+        if user is None or not user.is_authenticated:
+            return queryset
+
+        wanted = selected_fields(request, ['liked_by_me', 'author_followed_by_me'])
+        Follow = get_user_model().followers.through
+        annotations = {}
+        if 'liked_by_me' in wanted:
+            annotations['liked_by_me'] = Exists(
+                Like.objects.filter(post=OuterRef('pk'), user=user)
+            )
+        if 'author_followed_by_me' in wanted:
+            annotations['author_followed_by_me'] = Exists(
+                Follow.objects.filter(from_customuser=OuterRef('author_id'), to_customuser=user)
+            )
+        return queryset.annotate(**annotations)
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Highlighted match, present on ?q= full-text search results
+        if hasattr(instance, 'search_snippet'):
+            data['search_snippet'] = highlight(instance.search_snippet)
+        return data
+
+    def get_latest_comments(self, obj):
+        latest = getattr(obj, 'latest_comments', None)
+        if latest is None:
+            latest = obj.comments.select_related('author').order_by('-created_at', '-id')[:self.comment_limit]
+        return CommentSerializer(reversed(list(latest)), many=True, context=self.context).data
+
+    def get_has_more_comments(self, obj):
+        if self.comment_limit is None:
+            return False
+        return obj.comment_count > self.comment_limit
+
+
 
-    def get_comment_count(self, obj):
-        return obj.comments.count()
\ No newline at end of file
+class LikeStatusSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=MAX_LIKE_STATUS_IDS,
+    )
@@ -0,0 +1,23 @@
+# posts/signals.py
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Post
+from .search import index_post, unindex_post
+
+# Fields mirrored into the full-text index (see posts.search)
+INDEXED_FIELDS = {'title', 'content', 'author'}
+
+
+@receiver(post_save, sender=Post, dispatch_uid='posts_index_post')
+def update_search_index(sender, instance, update_fields=None, raw=False, **kwargs):
+    # Counter updates and other partial saves don't touch the indexed text
+    if raw or (update_fields is not None and not INDEXED_FIELDS & set(update_fields)):
+        return
+    index_post(instance)
+
+
+@receiver(post_delete, sender=Post, dispatch_uid='posts_unindex_post')
+def remove_from_search_index(sender, instance, **kwargs):
+    unindex_post(instance.pk)
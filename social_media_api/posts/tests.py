@@ -1,3 +1,763 @@
-from django.test import TestCase
+# posts/tests.py
 
-# Create your tests here.
+import json
+from importlib import import_module
+from io import StringIO
+from urllib.parse import parse_qs, urlparse
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, connections, router
+from django.db.models import Exists, F, OuterRef
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APITestCase
+
+from notifications.models import Notification
+from social_media_api.db_router import ReadYourWritesMiddleware, is_sticky, replica_reads
+from social_media_api.testing import bound_connection
+
+from . import async_views
+from .models import Comment, Like, Post, TimelineEntry
+from .pagination import KeysetPagination
+
+User = get_user_model()
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class FeedTimelineTestCase(APITestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='testpass123')
+        self.bob = User.objects.create_user(username='bob', password='testpass123')
+        self.carol = User.objects.create_user(username='carol', password='testpass123')
+
+        # alice follows bob
+        self.alice.following.add(self.bob)
+
+    def test_create_post_fans_out_to_followers(self):
+        self.client.force_authenticate(self.bob)
+        response = self.client.post(reverse('post-list'), {'title': 'Hi', 'content': 'Hello'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        post = Post.objects.get(pk=response.data['id'])
+        self.assertTrue(TimelineEntry.objects.filter(owner=self.alice, post=post).exists())
+        self.assertFalse(TimelineEntry.objects.filter(owner=self.carol).exists())
+
+    def test_feed_reads_timeline(self):
+        self.client.force_authenticate(self.bob)
+        self.client.post(reverse('post-list'), {'title': 'First', 'content': '1'})
+        self.client.post(reverse('post-list'), {'title': 'Second', 'content': '2'})
+
+        self.client.force_authenticate(self.alice)
+        response = self.client.get(reverse('feed'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([p['title'] for p in response.data['results']], ['Second', 'First'])
+
+    def test_delete_post_prunes_timeline(self):
+        self.client.force_authenticate(self.bob)
+        response = self.client.post(reverse('post-list'), {'title': 'Gone', 'content': 'soon'})
+        self.client.delete(reverse('post-detail', args=[response.data['id']]))
+
+        self.assertFalse(TimelineEntry.objects.filter(owner=self.alice).exists())
+
+    def test_follow_and_unfollow_update_timeline(self):
+        post = Post.objects.create(author=self.carol, title='Old', content='post')
+
+        self.client.force_authenticate(self.alice)
+        self.client.post(reverse('customuser-follow', args=[self.carol.pk]))
+        self.assertTrue(TimelineEntry.objects.filter(owner=self.alice, post=post).exists())
+
+        self.client.post(reverse('customuser-unfollow', args=[self.carol.pk]))
+        self.assertFalse(TimelineEntry.objects.filter(owner=self.alice, post=post).exists())
+
+    def test_rebuild_timelines_command(self):
+        post = Post.objects.create(author=self.bob, title='Missed', content='fan-out')
+
+        call_command('rebuild_timelines', 'alice', stdout=StringIO())
+        self.assertTrue(TimelineEntry.objects.filter(owner=self.alice, post=post).exists())
+
+    def test_migration_backfills_existing_timelines(self):
+        backfill = import_module('posts.migrations.0008_backfill_timelines').backfill_timelines
+        fanned_out = Post.objects.create(author=self.bob, title='Fanned out', content='x')
+        TimelineEntry.objects.create(owner=self.alice, post=fanned_out, created_at=fanned_out.created_at)
+        missed = Post.objects.create(author=self.bob, title='Missed', content='x')
+        Post.objects.create(author=self.carol, title='Unfollowed', content='x')
+
+        backfill(apps, None)
+        self.assertEqual(
+            set(TimelineEntry.objects.values_list('owner', 'post')),
+            {(self.alice.pk, fanned_out.pk), (self.alice.pk, missed.pk)},
+        )
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class CursorPaginationTestCase(APITestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='testpass123')
+        self.bob = User.objects.create_user(username='bob', password='testpass123')
+        self.alice.following.add(self.bob)
+
+        self.client.force_authenticate(self.bob)
+        for i in range(5):
+            self.client.post(reverse('post-list'), {'title': f'Post {i}', 'content': 'x'})
+
+    def walk(self, url):
+        titles, pages = [], 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            titles += [p['title'] for p in response.data['results']]
+            url = response.data['next']
+            pages += 1
+        return titles, pages
+
+    def test_post_list_walks_all_pages(self):
+        titles, pages = self.walk(reverse('post-list') + '?pagination=cursor&page_size=2')
+        self.assertEqual(titles, [f'Post {i}' for i in reversed(range(5))])
+        self.assertEqual(pages, 3)
+
+    def test_feed_walks_all_pages(self):
+        self.client.force_authenticate(self.alice)
+        titles, _ = self.walk(reverse('feed') + '?pagination=cursor&page_size=2')
+        self.assertEqual(titles, [f'Post {i}' for i in reversed(range(5))])
+
+    def test_previous_link_returns_prior_page(self):
+        first = self.client.get(reverse('post-list') + '?pagination=cursor&page_size=2')
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual(back.data['results'], first.data['results'])
+
+    def test_new_posts_do_not_shift_pages(self):
+        first = self.client.get(reverse('post-list') + '?pagination=cursor&page_size=2')
+        self.client.post(reverse('post-list'), {'title': 'Newest', 'content': 'x'})
+        second = self.client.get(first.data['next'])
+        self.assertEqual([p['title'] for p in second.data['results']], ['Post 2', 'Post 1'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('post-list') + '?cursor=garbage')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cursor_with_bad_key_values(self):
+        self.client.force_authenticate(self.alice)
+        paginator = KeysetPagination()
+        urls = [reverse('post-list'), reverse('feed'), reverse('notification_list'),
+                reverse('customuser-followers', args=[self.alice.pk])]
+        for key in (['garbage', 1], ['2020-01-01T00:00:00+00:00', 'x'], [None, {}]):
+            token = paginator.encode_cursor(key)
+            for url in urls:
+                with self.subTest(url=url, key=key):
+                    response = self.client.get(url, {'cursor': token})
+                    self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class PostListQueryCountTestCase(APITestCase):
+    """A page of 100 posts must cost the same number of queries however many comments exist."""
+
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='testpass123')
+        self.bob = User.objects.create_user(username='bob', password='testpass123')
+        self.alice.following.add(self.bob)
+
+        posts = Post.objects.bulk_create(
+            Post(author=self.bob, title=f'Post {i}', content='x') for i in range(100)
+        )
+        TimelineEntry.objects.bulk_create(
+            TimelineEntry(owner=self.alice, post=post, created_at=post.created_at) for post in posts
+        )
+        self.posts = posts
+
+    def add_comments(self, per_post):
+        Comment.objects.bulk_create(
+            Comment(post=post, author=author, content='c')
+            for post in self.posts
+            for author in [self.alice, self.bob] * per_post
+        )
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 100)
+        return len(context)
+
+    def test_post_list_query_count_is_fixed(self):
+        self.client.force_authenticate(self.alice)
+        url = reverse('post-list') + '?page_size=100'
+
+        self.add_comments(1)
+        # COUNT, posts joined with authors, comments joined with authors; the
+        # validators come from those rows
+        self.assertEqual(self.count_queries(url), 3)
+
+        self.add_comments(5)
+        self.assertEqual(self.count_queries(url), 3)
+        self.assertEqual(self.count_queries(url + '&comments=2'), 3)
+        self.assertEqual(self.count_queries(url + '&omit=comments'), 2)
+
+    def test_feed_query_count_is_fixed(self):
+        self.client.force_authenticate(self.alice)
+        url = reverse('feed') + '?page_size=100'
+
+        self.add_comments(1)
+        baseline = self.count_queries(url)
+        self.add_comments(5)
+        self.assertEqual(self.count_queries(url), baseline)
+        self.assertLessEqual(baseline, 3)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class EngagementCounterTestCase(APITestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='testpass123')
+        self.bob = User.objects.create_user(username='bob', password='testpass123')
+        self.post = Post.objects.create(author=self.bob, title='Counted', content='x')
+
+    def test_comment_updates_counter(self):
+        self.client.force_authenticate(self.alice)
+        response = self.client.post(reverse('post-comments', args=[self.post.pk]), {'content': 'Nice'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+
+        comment = Comment.objects.get(post=self.post)
+        self.client.delete(reverse('comment-detail', args=[comment.pk]))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 0)
+
+    def test_decrements_clamp_drifted_counters_at_zero(self):
+        # Rows written behind the views' back, so every counter is still 0
+        Like.objects.create(post=self.post, user=self.alice)
+        comment = Comment.objects.create(post=self.post, author=self.alice, content='x')
+        self.alice.following.add(self.bob)
+
+        self.client.force_authenticate(self.alice)
+        self.assertEqual(self.client.post(reverse('post-unlike', args=[self.post.pk])).status_code, 200)
+        self.assertEqual(self.client.delete(reverse('comment-detail', args=[comment.pk])).status_code, 204)
+        self.assertEqual(self.client.post(reverse('customuser-unfollow', args=[self.bob.pk])).status_code, 200)
+
+        self.post.refresh_from_db()
+        self.bob.refresh_from_db()
+        self.alice.refresh_from_db()
+        self.assertEqual((self.post.like_count, self.post.comment_count), (0, 0))
+        self.assertEqual((self.bob.followers_count, self.alice.following_count), (0, 0))
+
+    def test_reconcile_counters_fixes_drift(self):
+        Like.objects.create(post=self.post, user=self.alice)
+        Comment.objects.create(post=self.post, author=self.alice, content='x')
+        self.alice.following.add(self.bob)
+        Post.objects.filter(pk=self.post.pk).update(like_count=7)
+
+        call_command('reconcile_counters', batch_size=1, stdout=StringIO())
+
+        self.post.refresh_from_db()
+        self.bob.refresh_from_db()
+        self.alice.refresh_from_db()
+        self.assertEqual((self.post.like_count, self.post.comment_count), (1, 1))
+        self.assertEqual((self.bob.followers_count, self.alice.following_count), (1, 1))
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class SparsePostPayloadTestCase(APITestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='testpass123')
+        self.post = Post.objects.create(author=self.alice, title='Popular', content='x', comment_count=5)
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=self.alice, content=f'Comment {i}') for i in range(5)
+        )
+
+    def test_fields_and_omit(self):
+        response = self.client.get(reverse('post-list') + '?fields=id,title,comments&omit=comments')
+        self.assertEqual(set(response.data['results'][0]), {'id', 'title'})
+
+    def test_latest_comments_only(self):
+        response = self.client.get(reverse('post-list') + '?comments=2')
+        post = response.data['results'][0]
+        self.assertEqual([c['content'] for c in post['comments']], ['Comment 3', 'Comment 4'])
+        self.assertTrue(post['has_more_comments'])
+
+    def test_detail_embeds_all_comments_by_default(self):
+        response = self.client.get(reverse('post-detail', args=[self.post.pk]))
+        self.assertEqual(len(response.data['comments']), 5)
+        self.assertFalse(response.data['has_more_comments'])
+
+    def test_invalid_comment_limit(self):
+        response = self.client.get(reverse('post-list') + '?comments=-1')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, FEED_ENGINE='ring', FEED_RING_SIZE=3)
+class RingFeedTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.alice = User.objects.create_user(username='alice', password='testpass123')
+        self.bob = User.objects.create_user(username='bob', password='testpass123')
+        self.carol = User.objects.create_user(username='carol', password='testpass123')
+        self.alice.following.add(self.bob, self.carol)
+
+        # Interleave authors so the merge has to alternate between rings
+        for i in range(4):
+            author = self.bob if i % 2 == 0 else self.carol
+            self.client.force_authenticate(author)
+            self.client.post(reverse('post-list'), {'title': f'Post {i}', 'content': 'x'})
+        self.client.force_authenticate(self.alice)
+
+    def feed_titles(self, url):
+        titles = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            titles += [p['title'] for p in response.data['results']]
+            url = response.data['next']
+        return titles
+
+    def test_feed_merges_author_rings(self):
+        titles = self.feed_titles(reverse('feed') + '?page_size=3')
+        self.assertEqual(titles, ['Post 3', 'Post 2', 'Post 1', 'Post 0'])
+
+    def test_rings_track_create_and_delete(self):
+        self.feed_titles(reverse('feed'))  # warm the rings
+
+        self.client.force_authenticate(self.bob)
+        self.client.post(reverse('post-list'), {'title': 'Post 4', 'content': 'x'})
+        self.client.delete(reverse('post-detail', args=[Post.objects.get(title='Post 2').pk]))
+
+        self.client.force_authenticate(self.alice)
+        titles = self.feed_titles(reverse('feed'))
+        self.assertEqual(titles[0], 'Post 4')
+        self.assertNotIn('Post 2', titles)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, NOTIFICATIONS_ASYNC=False)
+class LikeEndpointsTestCase(APITestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='testpass123')
+        self.bob = User.objects.create_user(username='bob', password='testpass123')
+        self.post = Post.objects.create(author=self.bob, title='Likeable', content='x')
+        self.client.force_authenticate(self.alice)
+
+    def like(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse('post_like', args=[self.post.pk]))
+
+    def test_like_is_idempotent(self):
+        self.assertEqual(self.like().status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.like().status_code, status.HTTP_200_OK)
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
+        self.assertEqual(Like.objects.count(), 1)
+        self.assertEqual(self.bob.notifications.count(), 1)
+
+    def test_unlike_is_idempotent(self):
+        self.like()
+        for _ in range(2):
+            response = self.client.post(reverse('post_unlike', args=[self.post.pk]))
+            self.assertEqual(response.data['status'], 'unliked')
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 0)
+        self.assertFalse(Like.objects.exists())
+
+    def test_router_routes_match_manual_routes(self):
+        response = self.client.post(reverse('post-like', args=[self.post.pk]))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.post(reverse('post-unlike', args=[self.post.pk]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_missing_post(self):
+        self.assertEqual(self.client.post(reverse('post_like', args=[999])).status_code, 404)
+        self.assertEqual(self.client.post(reverse('post_unlike', args=[999])).status_code, 404)
+
+    def test_non_numeric_post_id_is_404(self):
+        self.assertEqual(self.client.post('/api/posts/abc/like/').status_code, 404)
+        self.assertEqual(self.client.post('/api/posts/abc/unlike/').status_code, 404)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class ViewerStateTestCase(APITestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='testpass123')
+        self.bob = User.objects.create_user(username='bob', password='testpass123')
+        self.liked = Post.objects.create(author=self.bob, title='Liked', content='x')
+        self.other = Post.objects.create(author=self.alice, title='Own', content='x')
+        Like.objects.create(post=self.liked, user=self.alice)
+        self.alice.following.add(self.bob)
+        self.client.force_authenticate(self.alice)
+
+    def test_posts_carry_viewer_flags(self):
+        response = self.client.get(reverse('post-list'))
+        flags = {
+            p['title']: (p['liked_by_me'], p['author_followed_by_me'])
+            for p in response.data['results']
+        }
+        self.assertEqual(flags, {'Liked': (True, True), 'Own': (False, False)})
+
+    def test_anonymous_viewer_gets_false(self):
+        self.client.force_authenticate(None)
+        response = self.client.get(reverse('post-detail', args=[self.liked.pk]))
+        self.assertFalse(response.data['liked_by_me'])
+
+    def test_batch_like_status(self):
+        ids = [self.liked.pk, self.other.pk, 999]
+        with self.assertNumQueries(1):
+            response = self.client.post(reverse('post-like-status'), {'ids': ids}, format='json')
+        self.assertEqual(
+            response.data['liked'],
+            {str(self.liked.pk): True, str(self.other.pk): False, '999': False},
+        )
+
+    def test_batch_like_status_is_bounded(self):
+        response = self.client.post(
+            reverse('post-like-status'), {'ids': list(range(1, 502))}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class FullTextSearchTestCase(APITestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='testpass123')
+        self.client.force_authenticate(self.alice)
+        self.create('Django tips', 'Use select_related to avoid extra queries.')
+        self.create('Weekend', 'Went hiking, then read about django migrations.')
+        self.create('Cooking', 'Pasta with tomatoes.')
+
+    def create(self, title, content):
+        response = self.client.post(reverse('post-list'), {'title': title, 'content': content})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data['id']
+
+    def search(self, query):
+        response = self.client.get(reverse('post-list'), {'q': query})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['results']
+
+    def test_results_are_ranked_with_snippets(self):
+        results = self.search('django')
+        # The title match outranks the body-only match
+        self.assertEqual([post['title'] for post in results], ['Django tips', 'Weekend'])
+        self.assertIn('<mark>django</mark>', results[1]['search_snippet'])
+
+    def test_snippet_escapes_post_text(self):
+        self.create('Unsafe', '<script>alert(1)</script> & more')
+        snippet = self.search('alert')[0]['search_snippet']
+        self.assertEqual(snippet, '&lt;script&gt;<mark>alert</mark>(1)&lt;/script&gt; &amp; more')
+
+    def test_cursor_pagination_keeps_ranking(self):
+        for params in ({'q': 'django', 'pagination': 'cursor'}, {'q': 'django', 'cursor': 'junk'}):
+            response = self.client.get(reverse('post-list'), params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data['count'], 2)
+            self.assertEqual([post['title'] for post in response.data['results']], ['Django tips', 'Weekend'])
+
+        with self.settings(POSTS_PAGINATION_STYLE='cursor'):
+            self.assertEqual([post['title'] for post in self.search('django')], ['Django tips', 'Weekend'])
+
+    def test_terms_are_combined_and_prefixes_match(self):
+        self.assertEqual([post['title'] for post in self.search('hik* django')], ['Weekend'])
+        self.assertEqual(self.search('django pasta'), [])
+        # FTS5 operators in user input are treated as plain text
+        self.assertEqual(self.search('"NEAR(django'), [])
+
+    def test_index_follows_updates_and_deletes(self):
+        post_id = self.search('pasta')[0]['id']
+        self.client.patch(reverse('post-detail', args=[post_id]), {'content': 'Risotto tonight.'})
+        self.assertEqual(self.search('pasta'), [])
+        self.assertEqual(len(self.search('risotto')), 1)
+
+        self.client.delete(reverse('post-detail', args=[post_id]))
+        self.assertEqual(self.search('risotto'), [])
+
+    def test_rebuild_search_index_command(self):
+        Post.objects.bulk_create([Post(author=self.alice, title='Bulk', content='Loaded without signals')])
+        self.assertEqual(self.search('bulk'), [])
+
+        call_command('rebuild_search_index', batch_size=2, stdout=StringIO())
+        self.assertEqual(len(self.search('bulk')), 1)
+        self.assertEqual(len(self.search('django')), 2)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class ConditionalGetTestCase(APITestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='testpass123')
+        self.bob = User.objects.create_user(username='bob', password='testpass123')
+        self.post = Post.objects.create(author=self.bob, title='Hello', content='x')
+        Comment.objects.create(post=self.post, author=self.bob, content='first')
+        self.client.force_authenticate(self.alice)
+
+    def revalidate(self, url, **headers):
+        """Fetches ``url``, then re-requests it with the returned ETag."""
+        response = self.client.get(url, **headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('ETag', response)
+        self.assertIn('Authorization', response['Vary'])
+        return response, self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_unchanged_list_detail_and_comments_get_304(self):
+        for url in [
+            reverse('post-list'),
+            reverse('post-list') + '?pagination=cursor',
+            reverse('post-detail', args=[self.post.pk]),
+            reverse('post-comments', args=[self.post.pk]),
+        ]:
+            with self.subTest(url=url):
+                first, second = self.revalidate(url)
+                self.assertEqual(second.status_code, status.HTTP_304_NOT_MODIFIED)
+                self.assertEqual(second['ETag'], first['ETag'])
+                self.assertFalse(second.content)
+
+    def test_304_skips_serialization(self):
+        url = reverse('post-list')
+        etag = self.client.get(url)['ETag']
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        # COUNT and the page's validator rows; no posts, authors or comments
+        self.assertEqual(len(context), 2)
+
+    def test_likes_comments_and_edits_change_the_etag(self):
+        list_url = reverse('post-list')
+        detail_url = reverse('post-detail', args=[self.post.pk])
+        comments_url = reverse('post-comments', args=[self.post.pk])
+
+        def edit_comment():
+            comment = Comment.objects.get(content='first')
+            comment.content = 'edited'
+            comment.save()
+
+        def edit_post():
+            self.client.force_authenticate(self.bob)
+            self.client.patch(detail_url, {'title': 'New'})
+
+        changes = [
+            lambda: self.client.post(reverse('post-like', args=[self.post.pk])),
+            lambda: self.client.post(comments_url, {'content': 'second'}),
+            edit_comment,
+            edit_post,
+        ]
+        for change in changes:
+            etags = {url: self.client.get(url)['ETag'] for url in (list_url, detail_url)}
+            change()
+            self.client.force_authenticate(self.alice)
+            for url, etag in etags.items():
+                with self.subTest(url=url):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                    self.assertEqual(response.status_code, status.HTTP_200_OK)
+                    self.assertNotEqual(response['ETag'], etag)
+
+        etag = self.client.get(comments_url)['ETag']
+        self.client.post(comments_url, {'content': 'third'})
+        self.assertEqual(self.client.get(comments_url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+    def test_etag_is_per_viewer(self):
+        url = reverse('post-detail', args=[self.post.pk])
+        etag = self.client.get(url)['ETag']
+        self.client.force_authenticate(self.bob)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+    def test_if_modified_since(self):
+        url = reverse('post-detail', args=[self.post.pk])
+        last_modified = self.client.get(url)['Last-Modified']
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_MODIFIED_SINCE='Thu, 01 Jan 2015 00:00:00 GMT').status_code,
+            status.HTTP_200_OK,
+        )
+
+    def test_missing_post_is_still_404(self):
+        url = reverse('post-detail', args=[self.post.pk + 100])
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='*').status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_non_numeric_post_id_is_404(self):
+        url = '/api/posts/abc/'
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='*').status_code, status.HTTP_404_NOT_FOUND)
+
+
+class SeedAndBenchmarkCommandTestCase(APITestCase):
+    def seed(self, **options):
+        options = {'users': 30, 'posts': 120, 'comments': 200, 'likes': 300, 'notifications': 50,
+                   'avg_follows': 5, 'seed': 1, **options}
+        call_command('seed_social_graph', stdout=StringIO(), **options)
+
+    def test_seeded_data_is_consistent(self):
+        self.seed()
+        users = User.objects.filter(username__startswith='seed')
+        self.assertEqual(users.count(), 30)
+        self.assertEqual(Post.objects.count(), 120)
+        self.assertEqual(Comment.objects.count(), 200)
+        self.assertEqual(Notification.objects.count(), 50)
+
+        # Counters match the rows (reconcile_counters has nothing to fix)
+        out = StringIO()
+        call_command('reconcile_counters', stdout=out)
+        self.assertIn('0 posts and 0 users corrected', out.getvalue())
+
+        # Power law: the most followed user has far more followers than the median one
+        followers = sorted(users.values_list('followers_count', flat=True))
+        self.assertGreater(followers[-1], 3 * max(followers[len(followers) // 2], 1))
+
+        # Timelines hold the followed authors' posts; comments never predate their post
+        follower = users.order_by('-following_count').first()
+        self.assertTrue(TimelineEntry.objects.filter(owner=follower).exists())
+        Follow = User.followers.through
+        followed = Follow.objects.filter(from_customuser=OuterRef('post__author'), to_customuser=OuterRef('owner'))
+        self.assertFalse(TimelineEntry.objects.filter(~Exists(followed)).exists())
+        self.assertFalse(Comment.objects.filter(created_at__lt=F('post__created_at')).exists())
+
+    def test_refuses_to_reuse_a_prefix(self):
+        self.seed(users=3, posts=3, comments=0, likes=0, notifications=0)
+        with self.assertRaises(CommandError):
+            self.seed(users=3)
+        self.seed(users=3, posts=3, prefix='other')
+
+    def test_benchmark_reports_percentiles_and_query_counts(self):
+        self.seed()
+        likes = Like.objects.count()
+        out = StringIO()
+        call_command('benchmark_endpoints', requests=4, warmup=1, users=3, stdout=out, stderr=StringIO())
+
+        report = json.loads(out.getvalue())
+        self.assertEqual(
+            set(report['scenarios']), {'feed', 'post_list', 'post_search', 'like', 'notifications'}
+        )
+        for name, result in report['scenarios'].items():
+            with self.subTest(scenario=name):
+                self.assertEqual(result['requests'], 4)
+                self.assertLessEqual(result['latency_ms']['p50'], result['latency_ms']['p99'])
+                self.assertGreater(result['queries']['p50'], 0)
+                self.assertFalse(set(result['status']) - {'200', '201'})
+        # Likes made by the benchmark are undone
+        self.assertEqual(Like.objects.count(), likes)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class AsyncFeedTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.alice = User.objects.create_user(username='alice', password='testpass123')
+        self.bob = User.objects.create_user(username='bob', password='testpass123')
+        self.alice.following.add(self.bob)
+        self.client.force_authenticate(self.bob)
+        for i in range(3):
+            self.client.post(reverse('post-list'), {'title': f'Post {i}', 'content': 'x'})
+        self.token = Token.objects.create(user=self.alice)
+        self.factory = AsyncRequestFactory()
+
+    async def get_feed(self, **params):
+        request = self.factory.get(
+            reverse('feed'), {'page_size': 2, **params}, headers={'Authorization': f'Token {self.token.key}'}
+        )
+        response = await async_views.feed(request)
+        return response.status_code, json.loads(response.content)
+
+    async def test_async_feed_matches_sync_feed(self):
+        status_code, page = await self.get_feed()
+        self.assertEqual(status_code, status.HTTP_200_OK)
+        self.assertEqual([post['title'] for post in page['results']], ['Post 2', 'Post 1'])
+        self.assertEqual(page['results'][0]['author']['username'], 'bob')
+
+        cursor = parse_qs(urlparse(page['next']).query)['cursor'][0]
+        _, page = await self.get_feed(cursor=cursor)
+        self.assertEqual([post['title'] for post in page['results']], ['Post 0'])
+        self.assertIsNone(page['next'])
+
+    async def test_async_feed_requires_token(self):
+        response = await async_views.feed(self.factory.get(reverse('feed')))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        status_code, _ = await self.get_feed(cursor='garbage')
+        self.assertEqual(status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(FEED_ENGINE='ring')
+    async def test_async_ring_feed(self):
+        _, page = await self.get_feed(page_size=10)
+        self.assertEqual([post['title'] for post in page['results']], ['Post 2', 'Post 1', 'Post 0'])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTestCase(TransactionTestCase):
+    def setUp(self):
+        # A second connection to the test database stands in for the replica, so
+        # routed reads see the same rows
+        self.enterContext(bound_connection('replica'))
+        cache.clear()
+        self.client = APIClient()
+        self.alice = User.objects.create_user(username='alice', password='testpass123')
+        Post.objects.create(author=self.alice, title='First', content='x')
+        self.client.force_authenticate(self.alice)
+
+    def list_queries(self, alias):
+        with CaptureQueriesContext(connections[alias]) as context:
+            response = self.client.get(reverse('post-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [query['sql'] for query in context.captured_queries if 'posts_post' in query['sql']]
+
+    def test_list_reads_from_replica(self):
+        self.assertTrue(self.list_queries('replica'))
+        self.assertFalse(self.list_queries('default'))
+
+    def test_writer_sticks_to_primary(self):
+        response = self.client.post(reverse('post-list'), {'title': 'Second', 'content': 'x'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(self.list_queries('replica'))
+
+        cache.clear()  # the stickiness window has passed
+        self.assertTrue(self.list_queries('replica'))
+
+    def test_one_replica_per_context(self):
+        picks = set()
+        with override_settings(DATABASE_REPLICAS=['replica', 'default']):
+            for _ in range(20):
+                with replica_reads():
+                    aliases = {router.db_for_read(Post) for _ in range(10)}
+                    with replica_reads():
+                        aliases.add(router.db_for_read(Post))
+                self.assertEqual(len(aliases), 1)
+                picks |= aliases
+        self.assertEqual(picks, {'replica', 'default'})
+
+    async def test_sticky_middleware_runs_async(self):
+        async def view(request):
+            return HttpResponse(status=201)
+
+        middleware = ReadYourWritesMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        request = AsyncRequestFactory().post('/')
+        request.user = self.alice
+        await middleware(request)
+        self.assertTrue(await sync_to_async(is_sticky)(self.alice))
+
+    def test_benchmark_counts_replica_queries(self):
+        def list_queries():
+            cache.clear()
+            out = StringIO()
+            call_command('benchmark_endpoints', scenario=['post_list'], requests=2, warmup=0,
+                         stdout=out, stderr=StringIO())
+            return json.loads(out.getvalue())['scenarios']['post_list']['queries']['p50']
+
+        with override_settings(DATABASE_REPLICAS=[]):
+            primary_only = list_queries()
+        self.assertEqual(list_queries(), primary_only)
+
+    def test_writes_from_replica_reads_go_to_primary(self):
+        with replica_reads():
+            post = Post.objects.get(title='First')
+        self.assertEqual(post._state.db, 'replica')
+        post.title = 'Edited'
+        with CaptureQueriesContext(connections['default']) as context:
+            post.save()
+        self.assertTrue(context.captured_queries)
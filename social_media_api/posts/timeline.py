@@ -0,0 +1,73 @@
+# posts/timeline.py
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from .models import Post, TimelineEntry
+
+# Rows written per INSERT when fanning out or rebuilding
+TIMELINE_BATCH_SIZE = 1000
+
+
+def _follower_ids(author_id):
+    """Ids of the users following ``author_id``, read straight from the through table."""
+    Follow = get_user_model().followers.through
+    return Follow.objects.filter(from_customuser_id=author_id).values_list(
+        'to_customuser_id', flat=True
+    )
+
+
+def _write_entries(entries):
+    TimelineEntry.objects.bulk_create(
+        entries, batch_size=TIMELINE_BATCH_SIZE, ignore_conflicts=True
+    )
+
+
+def fan_out_post(post):
+    """Pushes a freshly created post into the timeline of every follower of its author."""
+    _write_entries(
+        TimelineEntry(owner_id=owner_id, post_id=post.pk, created_at=post.created_at)
+        for owner_id in _follower_ids(post.author_id).iterator()
+    )
+
+
+def backfill_timeline(owner, *authors):
+    """Copies each author's recent posts into ``owner``'s timeline after a follow."""
+    limit = getattr(settings, 'TIMELINE_BACKFILL_LIMIT', 200)
+    # One windowed query for any number of newly followed authors
+    recent = (
+        Post.objects.filter(author__in=authors)
+        .annotate(
+            rank=Window(
+                RowNumber(),
+                partition_by=F('author_id'),
+                order_by=[F('created_at').desc(), F('id').desc()],
+            )
+        )
+        .filter(rank__lte=limit)
+    )
+    _write_entries(
+        TimelineEntry(owner=owner, post_id=post_id, created_at=created_at)
+        for post_id, created_at in recent.values_list('id', 'created_at')
+    )
+
+
+def prune_timeline(owner, *authors):
+    """Removes the authors' posts from ``owner``'s timeline after an unfollow."""
+    TimelineEntry.objects.filter(owner=owner, post__author__in=authors).delete()
+
+
+def rebuild_timeline(owner):
+    """Recomputes ``owner``'s whole timeline from the follow graph. Returns the row count."""
+    limit = getattr(settings, 'TIMELINE_REBUILD_LIMIT', 1000)
+    TimelineEntry.objects.filter(owner=owner).delete()
+
+    recent = Post.objects.filter(author__in=owner.following.all()).order_by('-created_at')[:limit]
+    entries = [
+        TimelineEntry(owner=owner, post_id=post_id, created_at=created_at)
+        for post_id, created_at in recent.values_list('id', 'created_at')
+    ]
+    _write_entries(entries)
+    return len(entries)
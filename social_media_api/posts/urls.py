@@ -1,10 +1,12 @@
 # posts/urls.py
 
 from rest_framework.routers import DefaultRouter
+from django.conf import settings
 from django.urls import path, include
 
 # FollowViewSet should NOT be here.
 from .views import PostViewSet, CommentViewSet, FeedView
+from . import async_views
 
 # Create a router instance
 router = DefaultRouter()
@@ -15,17 +17,23 @@ router.register(r"comments", CommentViewSet)
 
 urlpatterns = [
     
-    path("feed/", FeedView.as_view(), name="feed"),
+    # ASYNC_VIEWS serves the async ORM variant (posts.async_views) under ASGI
+    path(
+        "feed/",
+        async_views.feed if settings.ASYNC_VIEWS else FeedView.as_view(),
+        name="feed",
+    ),
    
+    # Pass each action's own kwargs (e.g. permission_classes) the way the router does
     path(
-        "posts/<int:pk>/like/", PostViewSet.as_view({"post": "like"}), name="post_like"
+        "posts/<int:pk>/like/",
+        PostViewSet.as_view({"post": "like"}, **PostViewSet.like.kwargs),
+        name="post_like",
     ),
     # unlike path
     path(
         "posts/<int:pk>/unlike/",
-        PostViewSet.as_view(
-            {"post": "like"}
-        ),  
+        PostViewSet.as_view({"post": "unlike"}, **PostViewSet.unlike.kwargs),
         name="post_unlike",  
     ),
     # Include all paths generated by the router
@@ -5,6 +5,26 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+Async deployment
+----------------
+With ``DJANGO_ASYNC_VIEWS=1`` the feed, notification list and unread-count routes are
+served by async views (posts.async_views, notifications.async_views) that use the
+async ORM, so one worker's event loop can hold many concurrent slow requests instead
+of tying up a thread per request. Run it under any ASGI server, e.g.::
+
+    pip install uvicorn
+    DJANGO_ASYNC_VIEWS=1 uvicorn social_media_api.asgi:application --workers 4
+
+The Server-Sent Events stream at /api/notifications/stream/ is always async and needs
+an ASGI server. Under WSGI it answers 501 Not Implemented: a WSGI server collects a
+streaming response's async iterator completely before sending it, which for an
+endless stream would never finish.
+
+Everything else stays a synchronous DRF view, which Django runs in a thread pool
+under ASGI. The async feed and notification list are cursor-paginated only. Under
+WSGI leave DJANGO_ASYNC_VIEWS unset; async views would then pay for an event loop
+per request.
 """
 
 import os
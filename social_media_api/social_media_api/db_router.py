@@ -0,0 +1,121 @@
+# social_media_api/db_router.py
+#
+# Read/write splitting. Writes always go to the primary ('default'). Reads go to a
+# replica from DATABASE_REPLICAS only inside replica_reads(), which the list views
+# enter through ReplicaReadMixin, so everything else (auth, detail views, the
+# queries inside write requests) keeps reading the primary.
+#
+# Read-your-writes: ReadYourWritesMiddleware flags a user in the cache after any
+# successful write request, and for DATABASE_STICKY_SECONDS afterwards that user's
+# list requests stay on the primary so they see their own changes despite lag.
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+# The replica alias reads go to inside replica_reads(), or None
+_replica_reads = ContextVar('replica_reads', default=None)
+
+
+def replica_aliases():
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+@contextmanager
+def replica_reads():
+    """
+    Routes ORM reads in this context (thread or task) to a replica, when any are
+    configured. One replica is picked per context, so all of a request's reads see
+    the same snapshot; nested contexts keep the outer pick.
+    """
+    aliases = replica_aliases()
+    alias = _replica_reads.get() or (random.choice(aliases) if aliases else None)
+    token = _replica_reads.set(alias)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def sticky_key(user_id):
+    return f'db:sticky:{user_id}'
+
+
+def mark_sticky(user):
+    cache.set(sticky_key(user.pk), True, getattr(settings, 'DATABASE_STICKY_SECONDS', 5))
+
+
+def is_sticky(user):
+    return user.is_authenticated and cache.get(sticky_key(user.pk)) is not None
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _replica_reads.get()
+
+    def db_for_write(self, model, **hints):
+        # Explicit, so saving an instance loaded from a replica still writes the primary
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Every alias holds the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive their schema with the data (see the sync_replica command)
+        if db in replica_aliases():
+            return False
+        return None
+
+
+class ReplicaReadMixin:
+    """Serves a view's list() from a replica unless the user wrote very recently."""
+
+    def list(self, request, *args, **kwargs):
+        if is_sticky(request.user):
+            return super().list(request, *args, **kwargs)
+        with replica_reads():
+            return super().list(request, *args, **kwargs)
+
+
+class ReadYourWritesMiddleware:
+    """Keeps a user's reads on the primary for a short window after they write."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        if self.is_write(request, response):
+            self.remember_writer(request)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if self.is_write(request, response):
+            # The user may still be a lazy object that loads from the database
+            await sync_to_async(self.remember_writer)(request)
+        return response
+
+    @staticmethod
+    def is_write(request, response):
+        return request.method not in ('GET', 'HEAD', 'OPTIONS') and response.status_code < 400
+
+    @staticmethod
+    def remember_writer(request):
+        # DRF copies the authenticated user onto the Django request
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            mark_sticky(user)
@@ -0,0 +1,53 @@
+# social_media_api/management/commands/sync_replica.py
+#
+# Copy job for the local read-replica stand-in: snapshots the primary SQLite database
+# into each replica file with SQLite's online backup API, which copies a consistent
+# image while the primary keeps serving reads and writes.
+
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = "Copies the primary SQLite database into its replica file(s), once or every --interval seconds."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'aliases', nargs='*',
+            help="Replica aliases to refresh (default: DATABASE_REPLICAS).",
+        )
+        parser.add_argument('--interval', type=float, default=0, help="Repeat every N seconds (0 = once).")
+        parser.add_argument('--pages', type=int, default=1024, help="Pages copied per backup step.")
+
+    def handle(self, *args, **options):
+        aliases = options['aliases'] or settings.DATABASE_REPLICAS
+        if not aliases:
+            raise CommandError("No replicas configured; name them in DJANGO_DB_REPLICAS (e.g. 'replica').")
+        for alias in [DEFAULT_DB_ALIAS, *aliases]:
+            if alias not in connections.settings:
+                raise CommandError(f"Unknown database alias '{alias}'.")
+            if connections[alias].vendor != 'sqlite':
+                raise CommandError(f"'{alias}' is not an SQLite database.")
+
+        while True:
+            for alias in aliases:
+                started = time.monotonic()
+                self.sync(alias, options['pages'])
+                self.stdout.write(f"Synced '{alias}' in {time.monotonic() - started:.2f}s.")
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+
+    def sync(self, alias, pages):
+        primary = connections[DEFAULT_DB_ALIAS]
+        primary.ensure_connection()
+        # Readers holding the replica open pick the new snapshot up on their next query
+        target = sqlite3.connect(connections[alias].settings_dict['NAME'])
+        try:
+            primary.connection.backup(target, pages=pages)
+        finally:
+            target.close()
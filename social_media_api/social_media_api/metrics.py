@@ -0,0 +1,206 @@
+# social_media_api/metrics.py
+#
+# Per-endpoint request metrics. MetricsMiddleware wraps every database connection with
+# connection.execute_wrapper() for the duration of a request to count its queries and
+# time spent in the database, and records that together with the wall time under the
+# request's view name, method and status in in-process histograms. metrics_view serves
+# them at /metrics in the Prometheus text format.
+#
+# The histograms live in the worker process; with several workers each one reports its
+# own (scrape them individually or sum in Prometheus). Streaming responses are timed
+# up to their headers.
+
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.db import connections
+from django.http import HttpResponse
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+LABELS = ('view', 'method', 'status')
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+@dataclass(frozen=True)
+class RequestRecord:
+    view: str
+    method: str
+    status: int
+    duration: float
+    queries: int
+    db_duration: float
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _labels(pairs):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a tuple of label values (not thread-safe itself)."""
+
+    def __init__(self, name, documentation, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (+Inf last), sum]
+        self.series = {}
+
+    def observe(self, labels, value):
+        counts, total = self.series.get(labels) or ([0] * (len(self.buckets) + 1), 0)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+        counts[-1] += 1
+        self.series[labels] = [counts, total + value]
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        for labels, (counts, total) in sorted(self.series.items()):
+            pairs = list(zip(LABELS, labels))
+            bounds = [*map(_number, self.buckets), '+Inf']
+            for bound, count in zip(bounds, counts):
+                lines.append(f'{self.name}_bucket{_labels([*pairs, ("le", bound)])} {count}')
+            lines.append(f'{self.name}_sum{_labels(pairs)} {_number(total)}')
+            lines.append(f'{self.name}_count{_labels(pairs)} {counts[-1]}')
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._listeners = []
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.duration = Histogram(
+                'django_http_request_duration_seconds', 'Wall time of a request.', DURATION_BUCKETS
+            )
+            self.queries = Histogram(
+                'django_http_request_db_queries', 'Database queries run by a request.', QUERY_BUCKETS
+            )
+            self.db_duration = Histogram(
+                'django_http_request_db_duration_seconds', 'Time a request spent in the database.',
+                DURATION_BUCKETS,
+            )
+
+    def record(self, record):
+        labels = (record.view, record.method, str(record.status))
+        with self._lock:
+            self.duration.observe(labels, record.duration)
+            self.queries.observe(labels, record.queries)
+            self.db_duration.observe(labels, record.db_duration)
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(record)
+
+    @contextmanager
+    def listen(self, callback):
+        """Calls ``callback(record)`` for every request recorded inside this block."""
+        with self._lock:
+            self._listeners.append(callback)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._listeners.remove(callback)
+
+    def render(self):
+        with self._lock:
+            histograms = (self.duration, self.queries, self.db_duration)
+            return '\n'.join(line for histogram in histograms for line in histogram.render()) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+class QueryStats:
+    """execute_wrapper callable counting and timing the queries that pass through it."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return '<unresolved>'
+    return match.view_name or match.route
+
+
+class MetricsMiddleware:
+    """Records view, status, wall time, query count and database time of every request."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = QueryStats()
+        start = time.perf_counter()
+        with self.wrap_connections(stats):
+            response = self.get_response(request)
+        self.record(request, response, time.perf_counter() - start, stats)
+        return response
+
+    async def __acall__(self, request):
+        # Async views run their ORM calls on the request's thread-sensitive sync thread,
+        # whose connections are the ones to wrap
+        stats = QueryStats()
+        start = time.perf_counter()
+        stack = await sync_to_async(self.wrap_connections)(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        self.record(request, response, time.perf_counter() - start, stats)
+        return response
+
+    @staticmethod
+    def wrap_connections(stats):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(stats))
+        return stack
+
+    @staticmethod
+    def record(request, response, duration, stats):
+        registry.record(RequestRecord(
+            view=view_name(request),
+            method=request.method,
+            status=response.status_code,
+            duration=duration,
+            queries=stats.count,
+            db_duration=stats.duration,
+        ))
+
+
+def metrics_view(request):
+    return HttpResponse(registry.render(), content_type=CONTENT_TYPE)
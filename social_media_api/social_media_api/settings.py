@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -49,6 +50,7 @@ INSTALLED_APPS = [
     'rest_framework',
     'rest_framework.authtoken',
     # Local apps
+    'social_media_api',  # project-wide management commands (sync_replica)
     'accounts',
     'posts',
     'notifications', 
@@ -61,14 +63,22 @@ AUTH_USER_MODEL = 'accounts.CustomUser'
 # Configure REST Framework's default authentication (Token)
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'accounts.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
-    ]
+    ],
+    # Sliding-window limits for the password-hashing endpoints (accounts.throttles)
+    'DEFAULT_THROTTLE_RATES': {
+        'login_ip': '20/min',
+        'login_username': '5/min',
+        'register_ip': '10/hour',
+    },
 }
 
 MIDDLEWARE = [
+    # Outermost, so its timings cover the whole stack (see social_media_api.metrics)
+    'social_media_api.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -76,6 +86,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'social_media_api.db_router.ReadYourWritesMiddleware',
 ]
 
 ROOT_URLCONF = 'social_media_api.urls'
@@ -101,14 +112,57 @@ WSGI_APPLICATION = 'social_media_api.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLite tuned for concurrent requests. Django runs each init_command statement on
+# every new connection:
+#   journal_mode=WAL      readers no longer block the writer (and vice versa)
+#   busy_timeout          a writer waits up to this many ms for the lock instead of
+#                         failing at once with "database is locked"
+#   synchronous=NORMAL    fsync at checkpoints only; safe with WAL
+#   mmap_size/cache_size  read through a 256 MiB memory map and a 64 MiB page cache
+# transaction_mode IMMEDIATE takes the write lock when a transaction starts, so a
+# read-then-write transaction waits on busy_timeout rather than failing to upgrade.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'busy_timeout': int(os.environ.get('DJANGO_SQLITE_BUSY_TIMEOUT', 20000)),
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,  # negative: KiB rather than pages
+    'temp_store': 'MEMORY',
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-        'PORT': ""
+        'PORT': "",
+        'OPTIONS': {
+            'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items()),
+            'transaction_mode': 'IMMEDIATE',
+        },
+        # Persistent connections: reuse a connection for this many seconds (0 closes it
+        # after every request, None keeps it forever); health checks drop broken ones.
+        'CONN_MAX_AGE': int(os.environ.get('DJANGO_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Read/write splitting (social_media_api.db_router): list endpoints read from these
+# aliases (comma-separated in DJANGO_DB_REPLICAS, e.g. "replica"; empty = primary
+# only), and a user who just wrote reads the primary for DATABASE_STICKY_SECONDS.
+DATABASE_ROUTERS = ['social_media_api.db_router.ReplicaRouter']
+DATABASE_REPLICAS = [alias for alias in os.environ.get('DJANGO_DB_REPLICAS', '').split(',') if alias]
+DATABASE_STICKY_SECONDS = 5
+
+# Each replica is, locally, a second SQLite file refreshed from the primary by
+# `manage.py sync_replica`; aliases exist only when named above. Under test they
+# mirror the primary.
+for alias in DATABASE_REPLICAS:
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'NAME': os.environ.get(f'DJANGO_SQLITE_{alias.upper()}', BASE_DIR / f'db.{alias}.sqlite3'),
+        'TEST': {'MIRROR': 'default'},
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -151,3 +205,49 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Home timeline (fan-out-on-write, see posts.timeline)
+# Recent posts copied into a timeline when its owner follows someone new
+TIMELINE_BACKFILL_LIMIT = 200
+# Newest posts kept per timeline by the rebuild_timelines command
+TIMELINE_REBUILD_LIMIT = 1000
+
+# Default pagination for the feed, post and comment lists: 'page' or 'cursor'.
+# Clients can always pick per request with ?pagination=page|cursor.
+POSTS_PAGINATION_STYLE = 'page'
+
+# Feed engine: 'timeline' (fan-out-on-write, posts.timeline) or 'ring'
+# (pull model, k-way merge over cached per-author rings, posts.rings)
+FEED_ENGINE = 'timeline'
+# Recent post keys kept per author ring, and how long a ring lives in the cache
+FEED_RING_SIZE = 200
+FEED_RING_TIMEOUT = 300
+
+# Cache (local-memory stand-in; point at a shared backend such as Redis in production)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'social-media-api',
+    }
+}
+
+# Notification pipeline (notifications.pipeline): events are queued after commit and
+# written in coalesced batches by a background worker. Disable to write inline.
+NOTIFICATIONS_ASYNC = True
+NOTIFICATIONS_BATCH_SIZE = 500
+# Seconds the worker keeps collecting a burst before writing it
+NOTIFICATIONS_FLUSH_INTERVAL = 0.5
+# Pub/sub hub feeding /api/notifications/stream/ (see notifications.hub). The
+# in-process LocalHub only reaches streams served by the writing process.
+NOTIFICATIONS_HUB = 'notifications.hub.LocalHub'
+# Seconds between keepalive comments on an idle stream
+NOTIFICATIONS_STREAM_KEEPALIVE = 15
+
+# Token authentication (accounts.authentication): tokens expire this many seconds after
+# they are issued (None = never) and are cached for AUTH_TOKEN_CACHE_TIMEOUT seconds.
+AUTH_TOKEN_EXPIRY = 60 * 60 * 24 * 30
+AUTH_TOKEN_CACHE_TIMEOUT = 300
+
+# Serve the feed, notification list and unread count from their async ORM variants
+# (posts.async_views, notifications.async_views). Meant for ASGI deployments; see asgi.py.
+ASYNC_VIEWS = os.environ.get('DJANGO_ASYNC_VIEWS', '').lower() in ('1', 'true', 'yes')
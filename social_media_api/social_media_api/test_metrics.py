@@ -0,0 +1,97 @@
+# social_media_api/test_metrics.py
+
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from posts.models import Post
+
+from .metrics import Histogram, MetricsMiddleware, registry
+
+User = get_user_model()
+
+
+def sample(text, metric, **labels):
+    """Value of the ``metric`` sample whose labels include ``labels``, or None."""
+    for line in text.splitlines():
+        match = re.match(rf'^{metric}\{{(.*)\}} (\S+)$', line)
+        if match and all(f'{name}="{value}"' in match[1].split(',') for name, value in labels.items()):
+            return float(match[2])
+    return None
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class MetricsTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        registry.reset()
+        self.alice = User.objects.create_user(username='alice', password='testpass123')
+        Post.objects.bulk_create(Post(author=self.alice, title=f'Post {i}', content='x') for i in range(3))
+        self.client.force_authenticate(self.alice)
+
+    def scrape(self):
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        return response.content.decode()
+
+    def test_requests_are_recorded_per_view_and_status(self):
+        for _ in range(2):
+            self.client.get(reverse('post-list'))
+        self.client.get(reverse('post-detail', args=[999]))
+        text = self.scrape()
+
+        labels = {'view': 'post-list', 'method': 'GET', 'status': '200'}
+        self.assertEqual(sample(text, 'django_http_request_duration_seconds_count', **labels), 2)
+        self.assertEqual(sample(text, 'django_http_request_duration_seconds_bucket', le='+Inf', **labels), 2)
+        self.assertGreater(sample(text, 'django_http_request_duration_seconds_sum', **labels), 0)
+        self.assertGreater(sample(text, 'django_http_request_db_duration_seconds_sum', **labels), 0)
+        # Three queries per request: none fit the 2 bucket, both fit the 3 bucket
+        self.assertEqual(sample(text, 'django_http_request_db_queries_sum', **labels), 6)
+        self.assertEqual(sample(text, 'django_http_request_db_queries_bucket', le='2', **labels), 0)
+        self.assertEqual(sample(text, 'django_http_request_db_queries_bucket', le='3', **labels), 2)
+
+        self.assertEqual(
+            sample(text, 'django_http_request_duration_seconds_count', view='post-detail', status='404'), 1
+        )
+        self.assertIn('# TYPE django_http_request_db_queries histogram', text)
+
+    def test_unresolved_paths_share_one_series(self):
+        self.client.get('/nowhere/')
+        self.client.get('/elsewhere/')
+        text = self.scrape()
+        self.assertEqual(sample(text, 'django_http_request_duration_seconds_count', view='<unresolved>'), 2)
+
+    async def test_async_requests_count_queries(self):
+        async def view(request):
+            # ORM calls from async code run on the request's sync thread
+            await Post.objects.acount()
+            await Post.objects.filter(author=self.alice).aexists()
+            return HttpResponse()
+
+        records = []
+        with registry.listen(records.append):
+            await MetricsMiddleware(view)(AsyncRequestFactory().get('/'))
+        self.assertEqual([(record.status, record.queries) for record in records], [(200, 2)])
+        self.assertGreater(records[0].db_duration, 0)
+
+
+class HistogramTestCase(SimpleTestCase):
+    def test_render(self):
+        histogram = Histogram('latency_seconds', 'Latency.', (0.1, 1))
+        histogram.observe(('a"b', 'GET', '200'), 0.5)
+        histogram.observe(('a"b', 'GET', '200'), 2)
+        self.assertEqual(histogram.render(), [
+            '# HELP latency_seconds Latency.',
+            '# TYPE latency_seconds histogram',
+            'latency_seconds_bucket{view="a\\"b",method="GET",status="200",le="0.1"} 0',
+            'latency_seconds_bucket{view="a\\"b",method="GET",status="200",le="1"} 1',
+            'latency_seconds_bucket{view="a\\"b",method="GET",status="200",le="+Inf"} 2',
+            'latency_seconds_sum{view="a\\"b",method="GET",status="200"} 2.5',
+            'latency_seconds_count{view="a\\"b",method="GET",status="200"} 2',
+        ])
@@ -0,0 +1,110 @@
+# social_media_api/test_query_budgets.py
+#
+# Per-view query budgets for the read endpoints. The endpoints are requested with a
+# small dataset and again after growing it tenfold; the budgets are fixed, so a
+# serializer that starts querying per row (PostSerializer, UserSerializer, ...) fails.
+
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from accounts.models import FollowRecommendation
+from notifications.models import Notification, Verb
+from posts.models import Comment, Like, Post, TimelineEntry
+
+from .testing import QueryBudgetMixin
+
+User = get_user_model()
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class QueryBudgetTestCase(QueryBudgetMixin, APITestCase):
+    query_budgets = {
+        # COUNT, posts with authors, comments with authors
+        'post-list': 3,
+        'post-detail': 2,
+        'post-comments': 3,
+        'comment-list': 2,
+        'feed': 3,
+        # Notifications with actors, one query per target type, plus the ContentType
+        # lookup while Django's ContentType cache is cold
+        'notification_list': 3,
+        'customuser-followers': 2,
+        'customuser-following': 2,
+        'follow_recommendations': 1,
+        'profile': 1,
+    }
+
+    def setUp(self):
+        cache.clear()
+        self.alice = User.objects.create_user(username='alice', password='testpass123')
+        self.client.force_authenticate(self.alice)
+        self.users = []
+        self.grow(2)
+
+    def grow(self, count):
+        """Adds ``count`` authors followed by alice, each with a post, comments, likes and a notification."""
+        start = len(self.users)
+        users = User.objects.bulk_create(
+            User(username=f'user{i}') for i in range(start, start + count)
+        )
+        self.users.extend(users)
+        Follow = User.followers.through
+        Follow.objects.bulk_create(
+            [Follow(from_customuser=user, to_customuser=self.alice) for user in users]
+            + [Follow(from_customuser=self.alice, to_customuser=user) for user in users]
+        )
+        posts = Post.objects.bulk_create(Post(author=user, title='t', content='c') for user in users)
+        TimelineEntry.objects.bulk_create(
+            TimelineEntry(owner=self.alice, post=post, created_at=post.created_at) for post in posts
+        )
+        Comment.objects.bulk_create(
+            Comment(post=post, author=user, content='c') for post in posts for user in users
+        )
+        Like.objects.bulk_create(Like(post=post, user=self.alice) for post in posts)
+        post_type = ContentType.objects.get_for_model(Post)
+        Notification.objects.bulk_create(
+            Notification(recipient=self.alice, actor=user, verb=Verb.LIKED,
+                         target_content_type=post_type, target_object_id=post.pk)
+            for user, post in zip(users, posts)
+        )
+        FollowRecommendation.objects.bulk_create(
+            FollowRecommendation(user=self.alice, candidate=user, score=1) for user in users
+        )
+        self.post = posts[0]
+
+    def request_all(self):
+        urls = [
+            reverse('post-list'),
+            reverse('post-list') + '?comments=2',
+            reverse('post-list') + '?pagination=cursor',
+            reverse('post-detail', args=[self.post.pk]),
+            reverse('post-comments', args=[self.post.pk]),
+            reverse('comment-list'),
+            reverse('feed'),
+            reverse('notification_list'),
+            reverse('customuser-followers', args=[self.alice.pk]),
+            reverse('customuser-following', args=[self.alice.pk]),
+            reverse('follow_recommendations'),
+            reverse('profile'),
+        ]
+        with self.assertQueryBudgets() as records:
+            for url in urls:
+                self.assertEqual(self.client.get(url).status_code, 200, url)
+        return records
+
+    def test_read_endpoints_stay_within_budget_as_data_grows(self):
+        self.assertEqual(len(self.request_all()), 12)
+        self.grow(20)
+        self.request_all()
+
+    def test_budget_violations_fail(self):
+        with self.assertRaisesMessage(AssertionError, 'ran 1 queries (budget 0)'):
+            with self.assertQueryBudgets({'profile': 0}):
+                self.client.get(reverse('profile'))
+        with self.assertRaisesMessage(AssertionError, "No query budget for view 'feed'"):
+            with self.assertQueryBudgets({}):
+                self.client.get(reverse('feed'))
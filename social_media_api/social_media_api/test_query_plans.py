@@ -0,0 +1,123 @@
+# social_media_api/test_query_plans.py
+#
+# Query-plan regression tests: every SELECT a hot endpoint issues is run through
+# SQLite's EXPLAIN QUERY PLAN, and the test fails if any step reads a whole table
+# or sorts through a temporary B-tree instead of walking an index.
+
+import re
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from notifications.models import Notification, Verb
+from posts.models import Comment, Like, Post, TimelineEntry
+
+User = get_user_model()
+
+# "SCAN posts_post" reads the whole table; "SCAN posts_post USING INDEX ..." walks an index
+FULL_SCAN = re.compile(r'^SCAN (\S+)$')
+TEMP_SORT = 'USE TEMP B-TREE'
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class QueryPlanTestCase(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user(username='alice', password='testpass123')
+        cls.bob = User.objects.create_user(username='bob', password='testpass123')
+        cls.alice.following.add(cls.bob)
+        # Enough edges on both sides of alice and bob for a second page
+        fans = User.objects.bulk_create(User(username=f'fan{i}') for i in range(25))
+        Follow = User.followers.through
+        Follow.objects.bulk_create(
+            [Follow(from_customuser=cls.bob, to_customuser=fan) for fan in fans]
+            + [Follow(from_customuser=fan, to_customuser=cls.alice) for fan in fans]
+        )
+
+        now = timezone.now()
+        posts = Post.objects.bulk_create(
+            Post(author=cls.bob, title=f'Post {i}', content='x') for i in range(30)
+        )
+        # Distinct timestamps so cursor pages have a real range condition
+        for i, post in enumerate(posts):
+            post.created_at = now - timedelta(minutes=i)
+        Post.objects.bulk_update(posts, ['created_at'])
+        cls.post = posts[0]
+
+        TimelineEntry.objects.bulk_create(
+            TimelineEntry(owner=cls.alice, post=post, created_at=post.created_at) for post in posts
+        )
+        Comment.objects.bulk_create(
+            Comment(post=post, author=cls.alice, content='c') for post in posts for _ in range(2)
+        )
+        Like.objects.bulk_create(Like(post=post, user=cls.alice) for post in posts[:10])
+        post_type = ContentType.objects.get_for_model(Post)
+        Notification.objects.bulk_create(
+            Notification(recipient=cls.bob, actor=cls.alice, verb=Verb.LIKED,
+                         target_content_type=post_type, target_object_id=post.pk)
+            for post in posts
+        )
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertIndexedPlans(self, user, url, follow_next=True, allow_sort=False):
+        """Requests ``url`` (and its next page) and checks the plan of every SELECT it ran."""
+        self.client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            if follow_next and isinstance(response.data, dict) and response.data.get('next'):
+                self.assertEqual(self.client.get(response.data['next']).status_code, 200)
+
+        tables = set(connection.introspection.table_names())
+        selects = [query['sql'] for query in context.captured_queries if query['sql'].startswith('SELECT')]
+        self.assertTrue(selects)
+        for sql in selects:
+            plan = self.explain(sql)
+            with self.subTest(url=url, sql=sql, plan=plan):
+                # Scans of subqueries (e.g. a window function's output) are not table scans
+                scans = [step for step in plan if FULL_SCAN.match(step) and FULL_SCAN.match(step)[1] in tables]
+                self.assertFalse(scans, 'full table scan')
+                if not allow_sort:
+                    self.assertFalse([step for step in plan if TEMP_SORT in step], 'temp B-tree sort')
+
+    def test_post_list(self):
+        self.assertIndexedPlans(self.alice, reverse('post-list') + '?pagination=cursor&page_size=10')
+
+    def test_post_list_latest_comments(self):
+        # SQLite always sorts a window function's input, so the latest-N prefetch
+        # (ROW_NUMBER() per post) may sort the page's comments; it must still seek them
+        self.assertIndexedPlans(
+            self.alice, reverse('post-list') + '?pagination=cursor&comments=1', allow_sort=True
+        )
+
+    def test_post_comments(self):
+        self.assertIndexedPlans(self.alice, reverse('post-comments', args=[self.post.pk]))
+
+    def test_feed(self):
+        self.assertIndexedPlans(self.alice, reverse('feed') + '?pagination=cursor&page_size=10')
+
+    def test_notification_list(self):
+        self.assertIndexedPlans(self.bob, reverse('notification_list') + '?page_size=10')
+
+    def test_unread_count(self):
+        self.assertIndexedPlans(self.bob, reverse('notification_unread_count'))
+
+    def test_comment_list(self):
+        self.assertIndexedPlans(self.alice, reverse('comment-list') + '?pagination=cursor&page_size=10')
+
+    def test_followers(self):
+        self.assertIndexedPlans(self.alice, reverse('customuser-followers', args=[self.bob.pk]))
+
+    def test_following(self):
+        self.assertIndexedPlans(self.alice, reverse('customuser-following', args=[self.alice.pk]))
@@ -0,0 +1,94 @@
+# social_media_api/test_sqlite_profile.py
+#
+# Concurrency stress test for the production SQLite profile (settings.DATABASES). The
+# test database is in memory, so each test copies its schema into a throwaway file and
+# binds 'default' to that file (with the same OPTIONS) in every thread that uses it.
+# Worker threads call the routed like/comment/unlike views, which read and write
+# through 'default', each with its own connection.
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, connection
+from django.test import TransactionTestCase, override_settings
+from django.urls import resolve, reverse
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from posts.models import Comment, Like, Post
+
+from .testing import bound_connection
+
+User = get_user_model()
+
+
+@override_settings(NOTIFICATIONS_ASYNC=False)
+class SQLiteConcurrencyTestCase(TransactionTestCase):
+    threads = 8
+    rounds = 15
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'stress.sqlite3')
+        # The migrated (and just flushed) test database, copied page by page
+        connection.ensure_connection()
+        target = sqlite3.connect(self.path)
+        try:
+            connection.connection.backup(target)
+        finally:
+            target.close()
+
+        with self.stress_database():
+            self.owner = User.objects.create(username='owner')
+            self.users = [User.objects.create(username=f'user{i}') for i in range(self.threads)]
+            self.post = Post.objects.create(author=self.owner, title='Hot', content='x')
+        self.factory = APIRequestFactory()
+
+    def stress_database(self):
+        return bound_connection(DEFAULT_DB_ALIAS, NAME=self.path)
+
+    def call(self, name, user, method='post', data=None):
+        """Calls the view routed at ``name`` for the post directly, without the middleware."""
+        url = reverse(name, args=[self.post.pk])
+        request = getattr(self.factory, method)(url, data, format='json')
+        force_authenticate(request, user=user)
+        match = resolve(url)
+        response = match.func(request, *match.args, **match.kwargs)
+        self.assertLess(response.status_code, 300, response.data)
+
+    def work(self, user, errors):
+        try:
+            with self.stress_database():
+                for _ in range(self.rounds):
+                    self.call('post-like', user)
+                    self.call('post-comments', user, data={'content': 'c'})
+                    self.call('post-unlike', user)
+                    self.call('post-detail', user, method='get')
+        except Exception as exc:
+            errors.append(exc)
+
+    def test_mixed_load_has_no_lock_errors(self):
+        errors = []
+        workers = [threading.Thread(target=self.work, args=(user, errors)) for user in self.users]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(errors, [])
+        with self.stress_database() as stress:
+            post = Post.objects.get(pk=self.post.pk)
+            self.assertEqual(post.comment_count, self.threads * self.rounds)
+            self.assertEqual(post.comment_count, Comment.objects.count())
+            self.assertEqual(post.like_count, 0)
+            self.assertFalse(Like.objects.exists())
+
+            with stress.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode')
+                self.assertEqual(cursor.fetchone()[0], 'wal')
+        # Nothing leaked into the in-memory test database
+        self.assertFalse(Post.objects.exists())
@@ -0,0 +1,78 @@
+# social_media_api/testing.py
+#
+# Test helpers shared across apps.
+
+import copy
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.utils import ConnectionDoesNotExist, load_backend
+
+from .metrics import registry
+
+
+@contextmanager
+def bound_connection(alias, **overrides):
+    """
+    Serves ``alias`` in the current thread with a new connection configured like the
+    default (test) database, with ``overrides`` applied to its settings (e.g. NAME). Lets
+    a test add an alias the settings don't define, or point 'default' at another file.
+    A new alias is listed by ``connections`` (and so in ``connections.all()``) while
+    bound, like a configured one; it connects up front, since test cases refuse to open
+    connections for listed aliases they don't declare. The previous connection is
+    restored on exit.
+    """
+    try:
+        previous = connections[alias]
+    except ConnectionDoesNotExist:
+        previous = None
+    settings_dict = {**copy.deepcopy(connections[DEFAULT_DB_ALIAS].settings_dict), **overrides}
+    connection = load_backend(settings_dict['ENGINE']).DatabaseWrapper(settings_dict, alias)
+    connections[alias] = connection
+    if previous is None:
+        connection.ensure_connection()
+        connections.settings[alias] = settings_dict
+    try:
+        yield connection
+    finally:
+        connection.close()
+        if previous is None:
+            del connections[alias]
+            del connections.settings[alias]
+        else:
+            connections[alias] = previous
+
+
+class QueryBudgetMixin:
+    """
+    TestCase mixin enforcing per-view query budgets. ``query_budgets`` maps view names
+    (as reported by MetricsMiddleware, e.g. 'post-list') to the most queries one request
+    to that view may run; inside ``assertQueryBudgets()`` every request is checked
+    against it, so an N+1 in a serializer fails the test instead of slowing production.
+    """
+
+    query_budgets = {}
+
+    @contextmanager
+    def assertQueryBudgets(self, budgets=None, strict=True):
+        """
+        Checks every request made in the block against ``budgets`` (default
+        ``query_budgets``). With ``strict``, requests to views without a budget fail too.
+        Yields the list of recorded requests.
+        """
+        budgets = self.query_budgets if budgets is None else budgets
+        records = []
+        with registry.listen(records.append):
+            yield records
+
+        self.assertTrue(records, "No requests were made.")
+        for record in records:
+            budget = budgets.get(record.view)
+            if budget is None:
+                if strict:
+                    self.fail(f"No query budget for view {record.view!r}.")
+                continue
+            self.assertLessEqual(
+                record.queries, budget,
+                f"{record.method} {record.view} ran {record.queries} queries (budget {budget}).",
+            )
@@ -2,10 +2,14 @@
 from django.contrib import admin
 from django.urls import path, include
 
+from .metrics import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     # Include the accounts app URLs under the 'auth/' path (common convention)
     path('auth/', include('accounts.urls')), 
     path('api/', include('posts.urls')),
     path('api/notifications/', include('notifications.urls')),
+    # Prometheus scrape target (per-view request/query metrics)
+    path('metrics', metrics_view, name='metrics'),
 ]